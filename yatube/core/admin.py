@@ -0,0 +1,30 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'lane',
+        'status',
+        'progress',
+        'attempts',
+        'run_after',
+        'created',
+        'updated',
+    )
+    list_filter = ('status', 'lane', 'name')
+    readonly_fields = (
+        'name', 'payload', 'lane', 'dedup_key', 'status', 'done', 'total',
+        'attempts', 'max_attempts', 'error')
+
+    def progress(self, job):
+        if not job.total:
+            return f'{job.done}'
+        return f'{job.done} / {job.total} ({job.done * 100 // job.total}%)'
+    progress.short_description = 'Прогресс'
+
+
+admin.site.register(Job, JobAdmin)
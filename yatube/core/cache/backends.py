@@ -0,0 +1,293 @@
+"""Кеш, общий для всех процессов сервера, без внешнего сервиса.
+
+SQLiteCache хранит записи в файле SQLite в режиме WAL: читатели
+не блокируют писателя, а запись из одного процесса сразу видна
+остальным. TwoTierCache держит перед ним небольшой LRU в памяти
+процесса с коротким временем жизни записей.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.backends.TwoTierCache',
+            'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+            'OPTIONS': {'LOCAL_MAX_ENTRIES': 1000, 'LOCAL_TIMEOUT': 1},
+        }
+    }
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+LIVE = '(expires IS NULL OR expires > ?)'
+# доля операций записи, после которых проверяется переполнение
+CULL_PROBABILITY: float = 0.01
+MISSING = object()
+
+
+def encode(value):
+    # целые числа хранятся как есть, чтобы incr выполнялся одним UPDATE
+    if type(value) is int:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite (WAL), безопасный для нескольких процессов."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        # соединение своё у каждого потока и у каждого форка процесса
+        if getattr(self.local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL'
+                ') WITHOUT ROWID')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self.connection.execute(
+            f'SELECT value FROM cache WHERE key = ? AND {LIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        marks = ', '.join('?' * len(keys))
+        rows = self.connection.execute(
+            f'SELECT key, value FROM cache WHERE key IN ({marks}) '
+            f'AND {LIVE}',
+            (*keys, time.time()),
+        )
+        return {keys[key]: decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.connection.execute(
+            'INSERT INTO cache VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE '
+            'SET value = excluded.value, expires = excluded.expires',
+            (
+                self._key(key, version),
+                encode(value),
+                self.get_backend_timeout(timeout),
+            ),
+        )
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            'INSERT INTO cache VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE '
+            'SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (
+                self._key(key, version),
+                encode(value),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+        self._maybe_cull()
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {LIVE}',
+            (
+                self.get_backend_timeout(timeout),
+                self._key(key, version),
+                time.time(),
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {LIVE}',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = decode(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (encode(value), key),
+            )
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def has_key(self, key, version=None):
+        row = self.connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {LIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        self.connection.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # соединения живут всё время процесса: открывать файл
+        # на каждый запрос дороже, чем держать его открытым
+        pass
+
+    def _maybe_cull(self):
+        if random.random() >= CULL_PROBABILITY:
+            return
+        connection = self.connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # записи без срока (поколения потоков) вытесняются последними:
+            # NULL в SQLite сортируется первым, поэтому порядок явный
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires IS NULL, expires '
+                'LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+
+class TwoTierCache(BaseCache):
+    """SQLiteCache с небольшим LRU в памяти процесса перед ним.
+
+    Локальная копия живёт не дольше LOCAL_TIMEOUT секунд, поэтому
+    изменения из других процессов видны с задержкой не больше этой.
+    Блокировки (add) и счётчики (incr) всегда идут в общий кеш.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1000))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 1))
+        self.shared = SQLiteCache(location, params)
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _remember(self, key, version, value, timeout=DEFAULT_TIMEOUT):
+        expires = time.time() + self.local_timeout
+        backend_expires = self.get_backend_timeout(timeout)
+        if backend_expires is not None:
+            expires = min(expires, backend_expires)
+        key = self.make_key(key, version=version)
+        with self.lock:
+            self.lru[key] = (encode(value), expires)
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.local_max_entries:
+                self.lru.popitem(last=False)
+
+    def _recall(self, key, version):
+        key = self.make_key(key, version=version)
+        with self.lock:
+            value, expires = self.lru.get(key, (MISSING, 0))
+            if value is MISSING:
+                return MISSING
+            if expires <= time.time():
+                del self.lru[key]
+                return MISSING
+            self.lru.move_to_end(key)
+        return decode(value)
+
+    def _forget(self, key, version):
+        with self.lock:
+            self.lru.pop(self.make_key(key, version=version), None)
+
+    def get(self, key, default=None, version=None):
+        value = self._recall(key, version)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version=version)
+        if value is MISSING:
+            return default
+        self._remember(key, version, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self._recall(key, version)
+            if value is not MISSING:
+                found[key] = value
+        rest = [key for key in keys if key not in found]
+        for key, value in self.shared.get_many(rest, version).items():
+            self._remember(key, version, value)
+            found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, version, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, version, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(key, version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        if self._recall(key, version) is not MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        self.shared.delete(key, version=version)
+
+    def clear(self):
+        with self.lock:
+            self.lru.clear()
+        self.shared.clear()
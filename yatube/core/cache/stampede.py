@@ -0,0 +1,69 @@
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+# сколько держится блокировка пересборки, секунд
+LOCK_TIMEOUT: int = 10
+# сколько устаревшее значение ещё можно отдавать, секунд
+STALE_TIMEOUT: int = 300
+WAIT_INTERVAL: float = 0.05
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def is_fresh(expires, delta, beta):
+    """Вероятностное досрочное обновление (XFetch).
+
+    Чем дольше пересборка и ближе срок, тем вероятнее, что один из
+    запросов обновит значение заранее, до массового истечения.
+    """
+    jitter = -delta * beta * math.log(1 - random.random())
+    return time.time() + jitter < expires
+
+
+def rebuild(key, build, timeout, version):
+    started = time.time()
+    value = build()
+    delta = time.time() - started
+    cache.set(
+        key,
+        (value, time.time() + timeout, delta, version),
+        timeout + STALE_TIMEOUT,
+    )
+    return value
+
+
+def get_or_build(key, build, timeout, version=None, beta=1.0,
+                 on_stale=None):
+    """Значение из кеша; при истечении пересобирает его один запрос.
+
+    Версия хранится внутри записи, а не в ключе, поэтому после смены
+    версии старая запись остаётся на месте и считается устаревшей.
+    Пока идёт пересборка, остальные получают устаревшее значение
+    (и вызывается on_stale), а если его нет — ждут результата,
+    но не дольше LOCK_TIMEOUT.
+    """
+    entry = cache.get(key)
+    if (entry is not None and entry[3] == version
+            and is_fresh(entry[1], entry[2], beta)):
+        return entry[0]
+    if cache.add(lock_key(key), 1, LOCK_TIMEOUT):
+        try:
+            return rebuild(key, build, timeout, version)
+        finally:
+            cache.delete(lock_key(key))
+    if entry is not None:
+        if on_stale is not None and entry[3] != version:
+            on_stale()
+        return entry[0]
+    deadline = time.time() + LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return build()
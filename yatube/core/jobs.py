@@ -0,0 +1,143 @@
+import json
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import DEFAULT, DONE, FAILED, LANES, PENDING, RUNNING, Job
+
+TASKS = {}
+
+# пауза перед повтором: 10 с, 20 с, 40 с...
+RETRY_BASE_DELAY: int = 10
+# задача, которая столько секунд не сообщала о прогрессе (Job.report),
+# считается брошенной: обработчик убит посреди работы
+LEASE_TIMEOUT: int = 10 * 60
+
+
+def task(name):
+    """Регистрирует функцию f(job, **kwargs) как фоновую задачу."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def discover():
+    # задачи объявляются в модулях tasks.py приложений
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, lane=DEFAULT, dedup_key=None, max_attempts=3, delay=0,
+            **kwargs):
+    """Ставит задачу в очередь lane.
+
+    Если в очереди уже ждёт задача с тем же dedup_key, новая
+    не создаётся и возвращается ожидающая.
+    """
+    if name not in TASKS:
+        raise KeyError(f'Неизвестная задача: {name}')
+    job = Job(
+        name=name,
+        payload=json.dumps(kwargs),
+        lane=lane,
+        dedup_key=dedup_key,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    while True:
+        try:
+            with transaction.atomic():
+                job.save()
+            return job
+        except IntegrityError:
+            if dedup_key is None:
+                raise
+            pending = Job.objects.filter(
+                dedup_key=dedup_key, status=PENDING).first()
+            # ожидающую задачу могли забрать, тогда пробуем ещё раз
+            if pending is not None:
+                return pending
+
+
+def requeue_expired(now):
+    """Возвращает в очередь задачи с истёкшей арендой.
+
+    Исчерпавшая попытки задача помечается ошибкой, как и та, вместо
+    которой в очереди уже ждёт такая же по dedup_key.
+    """
+    expired = Job.objects.filter(
+        status=RUNNING, updated__lt=now - timedelta(seconds=LEASE_TIMEOUT))
+    for job in expired[:10]:
+        job.error = 'Обработчик пропал, не завершив задачу.'
+        job.status = FAILED
+        if job.attempts < job.max_attempts:
+            job.status = PENDING
+            job.run_after = now
+        try:
+            with transaction.atomic():
+                job.save(update_fields=[
+                    'status', 'error', 'run_after', 'updated'])
+        except IntegrityError:
+            job.status = FAILED
+            job.save(update_fields=['status', 'error', 'updated'])
+
+
+def claim(lanes=LANES):
+    """Забирает готовую к запуску задачу или возвращает None.
+
+    Очереди просматриваются в порядке lanes, внутри очереди — по
+    времени запуска. Задачу получает только тот обработчик, чьё
+    обновление статуса прошло первым. Взятая задача арендуется
+    на LEASE_TIMEOUT секунд, аренду продлевает Job.report.
+    """
+    now = timezone.now()
+    requeue_expired(now)
+    for lane in lanes:
+        ready = Job.objects.filter(
+            status=PENDING, lane=lane, run_after__lte=now,
+        ).order_by('run_after', 'pk')
+        for pk in ready.values_list('pk', flat=True)[:10]:
+            claimed = Job.objects.filter(pk=pk, status=PENDING).update(
+                status=RUNNING, attempts=F('attempts') + 1, updated=now)
+            if claimed:
+                return Job.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    return RETRY_BASE_DELAY * 2 ** (attempts - 1)
+
+
+def run(job):
+    """Выполняет забранную задачу; при ошибке ставит её на повтор."""
+    try:
+        TASKS[job.name](job, **json.loads(job.payload))
+    except Exception:
+        job.error = traceback.format_exc()
+        job.status = FAILED
+        if job.attempts < job.max_attempts:
+            job.status = PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=backoff(job.attempts))
+    else:
+        job.status = DONE
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'error', 'run_after', 'updated'])
+    except IntegrityError:
+        # пока задача выполнялась, в очередь встала такая же
+        job.status = FAILED
+        job.save(update_fields=['status', 'error', 'updated'])
+    return job
+
+
+def execute(pk):
+    """Точка входа для пула потоков или процессов обработчика."""
+    try:
+        return run(Job.objects.get(pk=pk))
+    finally:
+        connection.close()
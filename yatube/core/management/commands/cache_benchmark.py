@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache.backends import SQLiteCache, TwoTierCache
+
+VALUE = {'html': 'x' * 2048}
+PARAMS = {'OPTIONS': {'MAX_ENTRIES': 100000}}
+
+
+def make_backends(directory):
+    return {
+        'locmem': lambda: LocMemCache('benchmark', PARAMS),
+        'filebased': lambda: FileBasedCache(
+            os.path.join(directory, 'files'), PARAMS),
+        'sqlite': lambda: SQLiteCache(
+            os.path.join(directory, 'cache.sqlite3'), PARAMS),
+        'two-tier': lambda: TwoTierCache(
+            os.path.join(directory, 'cache.sqlite3'), PARAMS),
+    }
+
+
+def ops_per_second(operation, ops):
+    started = time.perf_counter()
+    for i in range(ops):
+        operation(i)
+    return ops / (time.perf_counter() - started)
+
+
+def worker(factory, number, keys, barrier, hits):
+    """Пишет свою долю ключей, затем читает ключи всех процессов."""
+    backend = factory()
+    for i in range(number, keys, barrier.parties):
+        backend.set(f'key:{i}', VALUE)
+    barrier.wait()
+    hits.put(sum(
+        backend.get(f'key:{i}') is not None for i in range(keys)))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает бэкенды кеша: скорость в одном процессе '
+            'и долю попаданий при нескольких процессах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        ops, workers = options['ops'], options['workers']
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"backend":<10} {"set/s":>10} {"get/s":>10} {"hit rate":>9}')
+        for name, factory in make_backends(tempfile.mkdtemp()).items():
+            backend = factory()
+            backend.clear()
+            keys = min(ops, 1000)
+            set_rate = ops_per_second(
+                lambda i: backend.set(f'key:{i % keys}', VALUE), ops)
+            get_rate = ops_per_second(
+                lambda i: backend.get(f'key:{i % keys}'), ops)
+            backend.clear()
+
+            barrier = context.Barrier(workers)
+            hits = context.Queue()
+            processes = [
+                context.Process(
+                    target=worker,
+                    args=(factory, number, keys, barrier, hits),
+                )
+                for number in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            total = sum(hits.get() for _ in processes)
+            for process in processes:
+                process.join()
+            hit_rate = total / (keys * workers)
+            self.stdout.write(
+                f'{name:<10} {set_rate:>10.0f} {get_rate:>10.0f} '
+                f'{hit_rate:>9.0%}')
@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+from core.models import LANES
+
+POOLS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить накопившиеся задачи и выйти.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза между проверками пустой очереди, в секундах.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Сколько задач выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--pool',
+            choices=sorted(POOLS),
+            default='thread',
+            help='Пул для --workers больше 1: потоки или процессы.',
+        )
+        parser.add_argument(
+            '--lanes',
+            nargs='+',
+            choices=LANES,
+            default=list(LANES),
+            help='Какие очереди обслуживать, в порядке важности.',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] == 1:
+            self.run_inline(options)
+            return
+        # дочерние процессы не должны делить соединение с базой
+        connections.close_all()
+        pool = POOLS[options['pool']]
+        with pool(options['workers'], initializer=django.setup) as executor:
+            self.run_pool(executor, options)
+
+    def report(self, job):
+        self.stdout.write(f'{job}: {job.get_status_display()}')
+
+    def run_inline(self, options):
+        while True:
+            job = jobs.claim(options['lanes'])
+            if job is not None:
+                self.report(jobs.run(job))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['sleep'])
+
+    def run_pool(self, executor, options):
+        running = set()
+        while True:
+            job = None
+            if len(running) < options['workers']:
+                job = jobs.claim(options['lanes'])
+            if job is not None:
+                running.add(executor.submit(jobs.execute, job.pk))
+                continue
+            if not running:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+            finished, running = wait(
+                running, timeout=options['sleep'],
+                return_when=FIRST_COMPLETED)
+            for future in finished:
+                self.report(future.result())
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_status_created_idx',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='dedup_key',
+            field=models.CharField(blank=True, max_length=200, null=True, verbose_name='Ключ дедупликации'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='lane',
+            field=models.CharField(choices=[('high', 'Срочные'), ('default', 'Обычные'), ('bulk', 'Массовые')], default='default', max_length=10, verbose_name='Очередь'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='max_attempts',
+            field=models.PositiveSmallIntegerField(default=3, verbose_name='Попыток всего'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Не раньше'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'lane', 'run_after'], name='job_status_lane_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(status='pending'), fields=('dedup_key',), name='unique_pending_dedup_key'),
+        ),
+    ]
@@ -0,0 +1,138 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+STATUS_CHOICES = (
+    (PENDING, 'В очереди'),
+    (RUNNING, 'Выполняется'),
+    (DONE, 'Готово'),
+    (FAILED, 'Ошибка'),
+)
+
+# очереди в порядке важности; обработчик можно запустить на часть из них
+HIGH = 'high'
+DEFAULT = 'default'
+BULK = 'bulk'
+
+LANE_CHOICES = (
+    (HIGH, 'Срочные'),
+    (DEFAULT, 'Обычные'),
+    (BULK, 'Массовые'),
+)
+LANES = tuple(lane for lane, _ in LANE_CHOICES)
+
+
+class Job(models.Model):
+    """Фоновая задача: имя из реестра core.jobs и аргументы в JSON."""
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Задача')
+    payload = models.TextField(
+        default='{}',
+        verbose_name='Аргументы')
+    lane = models.CharField(
+        max_length=10,
+        choices=LANE_CHOICES,
+        default=DEFAULT,
+        verbose_name='Очередь')
+    dedup_key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        verbose_name='Ключ дедупликации')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Состояние')
+    done = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сделано')
+    total = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Всего')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='Попыток всего')
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Не раньше')
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'lane', 'run_after'],
+                name='job_status_lane_idx',
+            ),
+        ]
+        constraints = [
+            # в очереди не больше одной задачи с одним ключом
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=Q(status=PENDING),
+                name='unique_pending_dedup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    def report(self, done, total=None):
+        """Сохраняет прогресс, не трогая остальные поля,
+        и продлевает аренду задачи (см. core.jobs.claim).
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        self.updated = timezone.now()
+        Job.objects.filter(pk=self.pk).update(
+            done=self.done, total=self.total, updated=self.updated)
+
+
+class Blob(models.Model):
+    """Файл хранилища по содержимому и число записей, которые на него
+    ссылаются. Файлы с нулевым счётчиком удаляет сборщик мусора.
+    """
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Имя файла')
+    size = models.BigIntegerField(
+        default=0,
+        verbose_name='Размер')
+    refcount = models.IntegerField(
+        default=0,
+        verbose_name='Ссылок')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+        indexes = [
+            models.Index(
+                fields=['refcount', 'created'],
+                name='blob_refcount_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
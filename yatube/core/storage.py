@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from .models import Blob
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def sharded_name(directory, digest, extension):
+    """posts/ab/cd/abcd….jpg: не больше 256 подкаталогов на уровне."""
+    return os.path.join(
+        directory, digest[:2], digest[2:4], digest + extension.lower())
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Каталог и расширение берутся из имени, предложенного полем
+    (upload_to). Одинаковые загрузки хранятся одним файлом, а число
+    ссылок на него ведётся в Blob через acquire и release.
+    """
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        # хеш, посчитанный при приёме файла (posts.uploads)
+        digest = getattr(content, 'sha256', None) or content_digest(content)
+        name = sharded_name(
+            directory, digest, os.path.splitext(filename)[1])
+        if not self.exists(name):
+            name = super()._save(name, content)
+        Blob.objects.get_or_create(
+            name=name, defaults={'size': content.size})
+        return name
+
+
+def acquire(name):
+    """Увеличивает число ссылок на файл, заводя Blob при необходимости."""
+    if not name:
+        return
+    blobs = Blob.objects.filter(name=name)
+    if blobs.update(refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        blobs.update(refcount=F('refcount') + 1)
+
+
+def release(name, count=1):
+    if name:
+        Blob.objects.filter(name=name).update(
+            refcount=F('refcount') - count)
+
+
+content_storage = ContentAddressedStorage()
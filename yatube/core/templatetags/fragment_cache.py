@@ -0,0 +1,68 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache.stampede import get_or_build
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on,
+                 version=None):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        timeout = int(self.timeout.resolve(context))
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        version = None
+        if self.version is not None:
+            version = self.version.resolve(context)
+        request = context.get('request')
+
+        def on_stale():
+            if request is not None:
+                request.page_stale = True
+
+        return get_or_build(
+            key,
+            lambda: self.nodelist.render(context),
+            timeout,
+            version=version,
+            on_stale=on_stale,
+        )
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """Как {% cache %}, но фрагмент при истечении пересобирает
+    только один запрос.
+
+        {% fragment_cache 500 sidebar request.user.pk version=v %}
+            .. sidebar ..
+        {% endfragment_cache %}
+
+    Необязательная version не входит в ключ: фрагмент другой версии
+    отдаётся как устаревший, пока один запрос его пересобирает.
+    Страница с таким фрагментом помечается request.page_stale.
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    version = None
+    if tokens[-1].startswith('version='):
+        version = parser.compile_filter(tokens.pop()[len('version='):])
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments.")
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        version,
+    )
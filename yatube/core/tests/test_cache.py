@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.cache.stampede import get_or_build, lock_key
+
+
+class GetOrBuildTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.build = mock.Mock(return_value='fresh')
+
+    def test_value_is_built_once(self):
+        """Пока значение свежее, пересборки нет."""
+        get_or_build('fragment', self.build, 60)
+        self.assertEqual(get_or_build('fragment', self.build, 60), 'fresh')
+        self.build.assert_called_once()
+
+    def test_stale_value_served_while_rebuilding(self):
+        """Пока другой запрос пересобирает значение, отдаётся старое."""
+        cache.set('fragment', ('stale', 0, 0, None))
+        cache.add(lock_key('fragment'), 1)
+        self.assertEqual(get_or_build('fragment', self.build, 60), 'stale')
+        self.build.assert_not_called()
+
+    def test_expired_value_rebuilt_by_lock_holder(self):
+        """Устаревшее значение пересобирает получивший блокировку."""
+        cache.set('fragment', ('stale', 0, 0, None))
+        self.assertEqual(get_or_build('fragment', self.build, 60), 'fresh')
+        self.assertIsNone(cache.get(lock_key('fragment')))
+
+    def test_old_version_served_while_rebuilding(self):
+        """Запись прежней версии отдаётся, пока её пересобирают."""
+        get_or_build('fragment', lambda: 'old', 60, version=1)
+        cache.add(lock_key('fragment'), 1)
+        on_stale = mock.Mock()
+        self.assertEqual(
+            get_or_build(
+                'fragment', self.build, 60, version=2, on_stale=on_stale),
+            'old',
+        )
+        self.build.assert_not_called()
+        on_stale.assert_called_once()
+
+    def test_old_version_rebuilt_by_lock_holder(self):
+        """Новая версия пересобирается на месте старой записи."""
+        get_or_build('fragment', lambda: 'old', 60, version=1)
+        self.assertEqual(
+            get_or_build('fragment', self.build, 60, version=2), 'fresh')
+        self.assertEqual(
+            get_or_build('fragment', self.build, 60, version=2), 'fresh')
+        self.build.assert_called_once()
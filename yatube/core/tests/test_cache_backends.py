@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache.backends import SQLiteCache, TwoTierCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.location = os.path.join(directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.assertEqual(self.cache.get_many(['key', 'nope']), {
+            'key': {'a': 1}})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_value_is_missing(self):
+        """Просроченное значение не отдаётся и может быть добавлено."""
+        self.cache.set('key', 'old', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        """incr меняет число и падает на отсутствующем ключе."""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_shared_between_instances(self):
+        """Другой экземпляр (процесс) видит те же записи."""
+        self.cache.set('key', 'value')
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('key'), 'value')
+
+    def test_cull_prefers_entries_with_expiry(self):
+        """Записи без срока вытесняются после записей со сроком."""
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}})
+        cache.set_many({f'generation:{i}': i for i in range(3)}, None)
+        cache.set_many({f'page:{i}': i for i in range(5)}, 60)
+        with mock.patch('core.cache.backends.CULL_PROBABILITY', 1):
+            cache.set('page:new', 'new', 60)
+        self.assertEqual(
+            cache.get_many([f'generation:{i}' for i in range(3)]),
+            {f'generation:{i}': i for i in range(3)})
+        self.assertLess(
+            len(cache.get_many([f'page:{i}' for i in range(5)])), 5)
+
+    def test_cull_limits_entries_without_expiry(self):
+        """Записи без срока не растут сверх MAX_ENTRIES."""
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}})
+        keys = [f'generation:post:{i}' for i in range(8)]
+        cache.set_many({key: 1 for key in keys}, None)
+        with mock.patch('core.cache.backends.CULL_PROBABILITY', 1):
+            cache.set('generation:posts', 1, None)
+        self.assertLess(len(cache.get_many(keys)), 8)
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        location = os.path.join(directory, 'cache.sqlite3')
+        params = {'OPTIONS': {'LOCAL_TIMEOUT': 0.05}}
+        self.cache = TwoTierCache(location, params)
+        self.other = TwoTierCache(location, params)
+
+    def test_local_copy_expires(self):
+        """Изменение из другого процесса видно после LOCAL_TIMEOUT."""
+        self.cache.set('key', 'old')
+        self.assertEqual(self.cache.get('key'), 'old')
+        self.other.set('key', 'new')
+        time.sleep(0.06)
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_add_goes_to_shared_tier(self):
+        """Блокировка через add видна всем процессам сразу."""
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.other.add('lock', 1))
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import (BULK, DEFAULT, DONE, FAILED, HIGH, PENDING,
+                         RUNNING, Job)
+
+CALLS = []
+
+
+@jobs.task('tests.record')
+def record(job, value):
+    CALLS.append(value)
+    job.report(1, 1)
+
+
+@jobs.task('tests.fail')
+def fail(job):
+    raise RuntimeError('сломалось')
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_claim_and_run(self):
+        """Задача забирается из очереди один раз и выполняется."""
+        job = jobs.enqueue('tests.record', value=42)
+        self.assertEqual(job.status, PENDING)
+        claimed = jobs.claim()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, RUNNING)
+        self.assertIsNone(jobs.claim())
+        jobs.run(claimed)
+        job.refresh_from_db()
+        self.assertEqual(CALLS, [42])
+        self.assertEqual((job.status, job.done, job.total), (DONE, 1, 1))
+
+    def test_failure_is_retried_with_backoff(self):
+        """Упавшая задача повторяется с растущей паузой, затем сдаётся."""
+        jobs.enqueue('tests.fail', max_attempts=2)
+        started = timezone.now()
+        job = jobs.run(jobs.claim())
+        self.assertEqual(job.status, PENDING)
+        self.assertIn('сломалось', job.error)
+        self.assertGreaterEqual(
+            job.run_after, started + timedelta(seconds=jobs.backoff(1)))
+        self.assertIsNone(jobs.claim())
+
+        Job.objects.update(run_after=timezone.now())
+        job = jobs.run(jobs.claim())
+        self.assertEqual((job.status, job.attempts), (FAILED, 2))
+
+    def test_dedup_key(self):
+        """Пока задача ждёт, такая же в очередь не добавляется."""
+        first = jobs.enqueue('tests.record', dedup_key='same', value=1)
+        second = jobs.enqueue('tests.record', dedup_key='same', value=2)
+        self.assertEqual(first.pk, second.pk)
+        jobs.claim()
+        third = jobs.enqueue('tests.record', dedup_key='same', value=3)
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_abandoned_job_is_requeued(self):
+        """Задача убитого обработчика возвращается в очередь по аренде."""
+        job = jobs.enqueue('tests.record', dedup_key='lease', value=7)
+        jobs.claim()
+        self.assertIsNone(jobs.claim())
+        expired = timezone.now() - timedelta(seconds=jobs.LEASE_TIMEOUT + 1)
+        Job.objects.filter(pk=job.pk).update(updated=expired)
+
+        claimed = jobs.claim()
+        self.assertEqual((claimed.pk, claimed.attempts), (job.pk, 2))
+        jobs.run(claimed)
+        self.assertEqual(CALLS, [7])
+
+    def test_abandoned_job_with_queued_duplicate_fails(self):
+        """Если такая же задача уже ждёт, брошенная помечается ошибкой."""
+        stuck = jobs.enqueue('tests.record', dedup_key='lease', value=1)
+        jobs.claim()
+        jobs.enqueue('tests.record', dedup_key='lease', value=2)
+        Job.objects.filter(pk=stuck.pk).update(
+            updated=timezone.now() - timedelta(
+                seconds=jobs.LEASE_TIMEOUT + 1))
+        jobs.run(jobs.claim())
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, FAILED)
+        self.assertEqual(CALLS, [2])
+
+    def test_lanes(self):
+        """Срочная очередь разбирается раньше, лишние очереди не видны."""
+        bulk = jobs.enqueue('tests.record', lane=BULK, value=1)
+        high = jobs.enqueue('tests.record', lane=HIGH, value=2)
+        self.assertIsNone(jobs.claim([DEFAULT]))
+        self.assertEqual(jobs.claim().pk, high.pk)
+        self.assertEqual(jobs.claim().pk, bulk.pk)
+
+    def test_worker_command(self):
+        """Обработчик выполняет все готовые задачи и выходит."""
+        for value in range(3):
+            jobs.enqueue('tests.record', value=value)
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertEqual(CALLS, [0, 1, 2])
+        self.assertFalse(Job.objects.exclude(status=DONE).exists())
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            jobs.enqueue('tests.missing')
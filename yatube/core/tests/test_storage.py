@@ -0,0 +1,44 @@
+import hashlib
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core import storage
+from core.models import Blob
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_same_content_stored_once(self):
+        """Одинаковые загрузки получают одно имя в шардированном каталоге."""
+        digest = hashlib.sha256(b'meme').hexdigest()
+        first = storage.content_storage.save(
+            'posts/meme.JPG', ContentFile(b'meme'))
+        second = storage.content_storage.save(
+            'posts/copy.jpg', ContentFile(b'meme'))
+        self.assertEqual(
+            first, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        self.assertEqual(first, second)
+        blob = Blob.objects.get()
+        self.assertEqual((blob.name, blob.size), (first, 4))
+
+    def test_refcount(self):
+        name = storage.content_storage.save(
+            'posts/a.png', ContentFile(b'a'))
+        storage.acquire(name)
+        storage.acquire(name)
+        storage.release(name)
+        self.assertEqual(Blob.objects.get(name=name).refcount, 1)
+        storage.acquire('posts/legacy.png')
+        self.assertEqual(
+            Blob.objects.get(name='posts/legacy.png').refcount, 1)
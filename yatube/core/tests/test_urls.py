@@ -1,6 +1,10 @@
 from http import HTTPStatus
 
+from django.core.cache import cache
 from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
 
 
 class CorePagesTests(TestCase):
@@ -10,3 +14,28 @@ class CorePagesTests(TestCase):
         response = self.user_client.get("/nonexist-page/")
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, "core/404.html")
+
+    def test_chrome(self):
+        """Личная часть страницы отдаётся отдельно от самой страницы."""
+        user = User.objects.create_user(username='HasNoName')
+        author = User.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse('core:chrome'), {'author': 'Author'})
+        chrome = response.json()
+        self.assertEqual(chrome['username'], 'HasNoName')
+        self.assertTrue(chrome['following'])
+        self.assertIn('Выйти', chrome['nav'])
+        self.assertTrue(chrome['csrf_token'])
+
+    def test_pages_shared_between_users(self):
+        """Страница поста одинакова для гостя и для автора."""
+        user = User.objects.create_user(username='HasNoName')
+        post = Post.objects.create(text='Пост', author=user)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        client = Client()
+        client.force_login(user)
+        guest_page = Client().get(url).content
+        cache.clear()
+        self.assertEqual(guest_page, client.get(url).content)
@@ -1,6 +1,12 @@
 from http import HTTPStatus
 
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.views.decorators.cache import never_cache
+
+from posts.models import Follow
 
 
 def page_not_found(request, exception):
@@ -19,3 +25,25 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=HTTPStatus.FORBIDDEN)
+
+
+@never_cache
+def chrome(request):
+    """Личная часть страницы: меню пользователя, CSRF-токен
+    и подписка на автора из ?author=.
+    """
+    user = request.user
+    nav = render_to_string(
+        'includes/user_nav.html',
+        {'view_name': request.GET.get('view')},
+        request=request,
+    )
+    data = {'nav': nav, 'username': None}
+    if user.is_authenticated:
+        data['username'] = user.username
+        data['csrf_token'] = get_token(request)
+        data['following'] = Follow.objects.filter(
+            user=user,
+            author__username=request.GET.get('author'),
+        ).exists()
+    return JsonResponse(data)
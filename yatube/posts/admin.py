@@ -1,9 +1,74 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
+from core import jobs
+
+from . import bulk, search
 from .models import Group, Post, Comment, Follow
+from .paginators import EstimatedCountPaginator
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех вариантов."""
+
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # без вариантов SimpleListFilter не показывается вовсе
+        return ((),)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value().strip()})
+        return queryset
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        ]
+        yield all_choice
+
+
+class AuthorFilter(InputFilter):
+    title = 'автор'
+    parameter_name = 'author'
+    lookup = 'author__username'
+
+
+class UserFilter(InputFilter):
+    title = 'подписчик'
+    parameter_name = 'user'
+    lookup = 'user__username'
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Список объектов без полного COUNT(*) и без выпадающих списков."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return self.paginator(queryset, per_page)
 
 
-class PostAdmin(admin.ModelAdmin):
+class RegroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Новая группа',
+        help_text='Оставьте пустым, чтобы убрать посты из групп.',
+    )
+
+
+class PostAdmin(ScalableAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,18 +76,86 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
+    list_select_related = ('author', 'group')
     list_editable = ('group',)
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
     search_fields = ('text',)
-    list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    list_filter = ('pub_date', AuthorFilter)
+    actions = ('regroup_posts', 'delete_posts', 'purge_authors')
+
+    def get_actions(self, request):
+        # стандартное удаление загружает каждый объект перед каскадом
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def enqueue(self, request, name, **kwargs):
+        job = jobs.enqueue(name, **kwargs)
+        self.message_user(
+            request, f'Задача {job} поставлена в очередь, '
+                     f'прогресс — в разделе «Фоновые задачи».')
+
+    def selection(self, request, queryset):
+        across = request.POST.get('select_across') == '1'
+        return bulk.selection(queryset, across=across)
+
+    def regroup_posts(self, request, queryset):
+        form = RegroupForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            group = form.cleaned_data['group']
+            self.enqueue(
+                request,
+                'posts.regroup',
+                selection=self.selection(request, queryset),
+                group_id=group.pk if group else None,
+            )
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Перенос постов в группу',
+            'opts': self.model._meta,
+            'form': form,
+            'action': 'regroup_posts',
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request, 'admin/posts/post/regroup.html', context)
+    regroup_posts.short_description = 'Перенести в группу'
+
+    def delete_posts(self, request, queryset):
+        self.enqueue(
+            request,
+            'posts.delete',
+            selection=self.selection(request, queryset),
+        )
+    delete_posts.short_description = 'Удалить выбранные посты'
+
+    def purge_authors(self, request, queryset):
+        self.enqueue(
+            request,
+            'posts.purge_authors',
+            selection=self.selection(request, queryset),
+        )
+    purge_authors.short_description = (
+        'Удалить авторов со всеми их постами и комментариями')
+
+    def get_search_results(self, request, queryset, search_term):
+        # поиск идёт по полнотекстовому индексу, а не LIKE по всей таблице
+        if not search.match_expression(search_term):
+            return queryset, False
+        return queryset.filter(pk__in=search.matching_ids(search_term)), False
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug')
     prepopulated_fields = {'slug': ('title',)}
+    search_fields = ('title', 'slug')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdmin):
     list_display = (
         "pk",
         "text",
@@ -30,20 +163,29 @@ class CommentAdmin(admin.ModelAdmin):
         "author",
         "post",
     )
-    search_fields = ("text", "author", "post")
-    list_filter = ("created", "author")
-    empty_value_display = "-пусто-"
+    list_select_related = ("author", "post")
+    raw_id_fields = ("author", "post")
+    search_fields = ("=author__username",)
+    list_filter = ("created", AuthorFilter)
+
+    def get_search_results(self, request, queryset, search_term):
+        # номер поста ищется по внешнему ключу, а не по тексту
+        search_term = search_term.strip()
+        if search_term.isdigit():
+            return queryset.filter(post_id=int(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = (
         "pk",
         "author",
         "user",
     )
-    search_fields = ("user", "author")
-    list_filter = ("user", "author")
-    empty_value_display = "-пусто-"
+    list_select_related = ("user", "author")
+    raw_id_fields = ("user", "author")
+    search_fields = ("=user__username", "=author__username")
+    list_filter = (UserFilter, AuthorFilter)
 
 
 admin.site.register(Post, PostAdmin)
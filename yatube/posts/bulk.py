@@ -0,0 +1,162 @@
+"""Массовые изменения постов одним UPDATE/DELETE на пачку.
+
+Объекты не загружаются и сигналы не отправляются, поэтому счётчики,
+поисковый индекс и версии кеша поправляются здесь же, по агрегатам пачки.
+"""
+from collections import Counter as Tally
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from . import cache, counters, feed, images, search
+from .models import Comment, Counter, Follow, Post, Timeline
+
+BULK_CHUNK_SIZE: int = 500
+
+
+def chunked(ids, size=BULK_CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def selection(queryset, across=True):
+    """Выборка постов в виде, пригодном для payload задачи.
+
+    Отмеченные на странице посты сохраняются списком id. Для «выбрать
+    все» сохраняется SQL запроса id — это могут быть миллионы строк —
+    и наибольший id на момент постановки задачи: посты, добавленные
+    после подтверждения действия, в выборку не попадут.
+    """
+    queryset = queryset.order_by()
+    if not across:
+        return {'ids': list(queryset.values_list('pk', flat=True))}
+    last = queryset.aggregate(last=Max('pk'))['last']
+    sql, params = queryset.values('pk').query.sql_with_params()
+    return {'sql': sql, 'params': list(params), 'last': last or 0}
+
+
+def selected_posts(selection):
+    if 'ids' in selection:
+        return Post.objects.filter(pk__in=selection['ids'])
+    return Post.objects.filter(
+        pk__lte=selection['last'],
+        pk__in=search.IdSubquery(selection['sql'], selection['params']),
+    )
+
+
+def chunked_ids(queryset, size=BULK_CHUNK_SIZE):
+    """id записей queryset пачками по возрастанию; каждая пачка —
+    отдельный запрос по ключу, так что записи, изменённые или удалённые
+    предыдущими пачками, не мешают следующим.
+    """
+    last = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last).order_by(
+            'pk').values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def raw_delete(queryset):
+    """DELETE по условию queryset без сбора объектов и сигналов."""
+    return queryset._raw_delete(queryset.db)
+
+
+def post_rows(post_ids):
+    return list(Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'author_id', 'group_id'))
+
+
+def bump_posts(rows, *extra_groups):
+    streams = {'posts'}
+    for pk, author_id, group_id in rows:
+        streams |= {f'post:{pk}', f'author:{author_id}'}
+        if group_id:
+            streams.add(f'group:{group_id}')
+    streams |= {f'group:{group_id}' for group_id in extra_groups if group_id}
+    cache.bump(*sorted(streams))
+
+
+def regroup_posts(post_ids, group_id):
+    """Переносит пачку постов в группу group_id (или убирает из групп)."""
+    moved = Post.objects.filter(pk__in=post_ids).exclude(group_id=group_id)
+    with transaction.atomic():
+        rows = list(moved.values_list('pk', 'author_id', 'group_id'))
+        if not rows:
+            return 0
+        # updated входит в ключ кеша карточек поста
+        Post.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+            group_id=group_id, updated=timezone.now())
+        for old_group, n in Tally(g for _, _, g in rows).items():
+            if old_group:
+                counters.increment(counters.GROUP_POSTS, old_group, -n)
+        if group_id:
+            counters.increment(counters.GROUP_POSTS, group_id, len(rows))
+    bump_posts(rows, group_id)
+    return len(rows)
+
+
+def delete_posts(post_ids):
+    """Удаляет пачку постов вместе с комментариями и строками лент."""
+    with transaction.atomic():
+        rows = post_rows(post_ids)
+        if not rows:
+            return 0
+        ids = [pk for pk, _, _ in rows]
+        names = Tally(Post.objects.filter(pk__in=ids).exclude(
+            image='').values_list('image', flat=True))
+        raw_delete(Timeline.objects.filter(post_id__in=ids))
+        raw_delete(Comment.objects.filter(post_id__in=ids))
+        raw_delete(Post.objects.filter(pk__in=ids))
+        search.unindex_posts(ids)
+        for name, n in names.items():
+            images.release_image(name, n)
+        counters.increment(counters.POSTS, counters.SITE, -len(rows))
+        for author_id, n in Tally(a for _, a, _ in rows).items():
+            counters.increment(counters.USER_POSTS, author_id, -n)
+        for group_id, n in Tally(g for _, _, g in rows).items():
+            if group_id:
+                counters.increment(counters.GROUP_POSTS, group_id, -n)
+        raw_delete(Counter.objects.filter(
+            name=counters.POST_COMMENTS, object_id__in=ids))
+    bump_posts(rows)
+    return len(rows)
+
+
+def delete_comments(comment_ids):
+    """Удаляет пачку комментариев, поправляя счётчики их постов."""
+    with transaction.atomic():
+        comments = Comment.objects.filter(pk__in=comment_ids)
+        per_post = dict(comments.values_list('post').annotate(
+            n=Count('pk')).order_by())
+        deleted = raw_delete(comments)
+        for post_id, n in per_post.items():
+            counters.increment(counters.POST_COMMENTS, post_id, -n)
+    cache.bump(*(f'post:{post_id}' for post_id in sorted(per_post)))
+    return deleted
+
+
+def delete_follows(follow_ids):
+    """Удаляет пачку подписок, поправляя счётчики подписчиков.
+
+    Ленты подписчиков не чистятся: вызывающий код удаляет их сам
+    или вместе с постами автора.
+    """
+    with transaction.atomic():
+        follows = Follow.objects.filter(pk__in=follow_ids)
+        pairs = list(follows.values_list('user_id', 'author_id'))
+        deleted = raw_delete(follows)
+        for user_id, n in Tally(u for u, _ in pairs).items():
+            counters.increment(counters.USER_FOLLOWING, user_id, -n)
+        for author_id, n in Tally(a for _, a in pairs).items():
+            counters.increment(counters.USER_FOLLOWERS, author_id, -n)
+            feed.update_pull_mode(author_id)
+    return deleted
+
+
+def delete_timeline(timeline_ids):
+    return raw_delete(Timeline.objects.filter(pk__in=timeline_ids))
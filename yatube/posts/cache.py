@@ -0,0 +1,150 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Comment, Post
+
+PAGE_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+
+def new_generation():
+    # после вытеснения из кеша поколение не должно совпасть со старым
+    return int(time.time() * 1000)
+
+
+def generation_key(stream):
+    return f'generation:{stream}'
+
+
+def changed_key(stream):
+    return f'changed:{stream}'
+
+
+def post_streams(post, *extra_groups):
+    """Потоки, в которых виден пост: общий, автора, группы и сам пост."""
+    streams = ['posts', f'author:{post.author_id}', f'post:{post.pk}']
+    streams += [
+        f'group:{group_id}'
+        for group_id in {post.group_id, *extra_groups}
+        if group_id
+    ]
+    return streams
+
+
+def generation(*streams):
+    """Текущая версия потоков для ключа кеша."""
+    keys = [generation_key(stream) for stream in streams]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = new_generation()
+            cache.add(key, version, None)
+            # без кеша (DummyCache) подойдёт и только что созданная
+            versions[key] = cache.get(key, version)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump(*streams):
+    """Делает устаревшими все закешированные страницы потоков."""
+    for stream in streams:
+        key = generation_key(stream)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_generation(), None)
+        cache.set(changed_key(stream), time.time(), None)
+
+
+def newest_in_stream(stream):
+    """Время последней записи потока по базе: pub_date или created."""
+    name, _, pk = stream.partition(':')
+    posts = Post.objects.all()
+    if name == 'group':
+        posts = posts.filter(group_id=pk)
+    elif name == 'author':
+        posts = posts.filter(author_id=pk)
+    elif name == 'post':
+        posts = posts.filter(pk=pk)
+        created = Comment.objects.filter(
+            post_id=pk).aggregate(newest=Max('created'))['newest']
+        if created:
+            return created.timestamp()
+    pub_date = posts.aggregate(newest=Max('pub_date'))['newest']
+    return pub_date.timestamp() if pub_date else time.time()
+
+
+def last_modified(*streams):
+    """Время последнего изменения потоков для Last-Modified."""
+    keys = {changed_key(stream): stream for stream in streams}
+    times = cache.get_many(keys)
+    for key, stream in keys.items():
+        if key not in times:
+            newest = newest_in_stream(stream)
+            cache.add(key, newest, None)
+            times[key] = cache.get(key, newest)
+    return int(max(times.values()))
+
+
+def page_streams(request, *streams):
+    """Отмечает, от каких потоков зависит страница, и возвращает
+    их текущую версию.
+    """
+    request.page_streams = streams
+    request.page_version = generation(*streams)
+    return request.page_version
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{path}'
+
+
+def cache_shared_page(view):
+    """Кеширует готовую страницу, одинаковую для всех читателей.
+
+    Всё личное подгружается отдельно через core:chrome. Страница
+    хранится, пока не изменятся потоки, отмеченные во view
+    через page_streams. Ответ получает ETag и Last-Modified, и на
+    повторный условный запрос отдаётся 304 без обращения к базе.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry and generation(*entry['streams']) == entry['version']:
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type'])
+        else:
+            response = view(request, *args, **kwargs)
+            streams = getattr(request, 'page_streams', None)
+            if response.status_code != 200 or not streams or response.cookies:
+                return response
+            # устаревший фрагмент нельзя запомнить под новой версией
+            if getattr(request, 'page_stale', False):
+                return response
+            entry = {
+                'streams': streams,
+                'version': request.page_version,
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'last_modified': last_modified(*streams),
+            }
+            cache.set(key, entry, PAGE_CACHE_TIMEOUT)
+        etag = quote_etag(entry['version'])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=entry['last_modified'],
+            response=response,
+        )
+    return wrapper
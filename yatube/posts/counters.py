@@ -0,0 +1,76 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Comment, Counter, Follow, Post
+
+# object_id глобального счётчика постов
+SITE: int = 0
+
+POSTS = 'posts'
+USER_POSTS = 'user_posts'
+USER_FOLLOWERS = 'user_followers'
+USER_FOLLOWING = 'user_following'
+POST_COMMENTS = 'post_comments'
+GROUP_POSTS = 'group_posts'
+# не счётчик, а отметка: автор в режиме чтения ленты при запросе,
+# value — время перехода в этот режим (см. posts.feed)
+FEED_PULLED = 'feed_pulled'
+
+
+def increment(name, object_id, delta=1):
+    """Атомарно меняет счётчик на delta, создавая его при необходимости."""
+    counters = Counter.objects.filter(name=name, object_id=object_id)
+    if counters.update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            Counter.objects.create(
+                name=name, object_id=object_id, value=delta)
+    except IntegrityError:
+        counters.update(value=F('value') + delta)
+
+
+def get(name, object_id=SITE):
+    value = Counter.objects.filter(
+        name=name, object_id=object_id).values_list('value', flat=True)
+    return value.first() or 0
+
+
+def drop(name, object_id):
+    Counter.objects.filter(name=name, object_id=object_id).delete()
+
+
+def actual_values():
+    """Точные значения всех счётчиков, посчитанные агрегатами."""
+    grouped = {
+        USER_POSTS: Post.objects.values_list('author'),
+        USER_FOLLOWERS: Follow.objects.values_list('author'),
+        USER_FOLLOWING: Follow.objects.values_list('user'),
+        POST_COMMENTS: Comment.objects.values_list('post'),
+        GROUP_POSTS: Post.objects.filter(
+            group__isnull=False).values_list('group'),
+    }
+    values = {(POSTS, SITE): Post.objects.count()}
+    for name, queryset in grouped.items():
+        for object_id, value in queryset.annotate(n=Count('pk')).order_by():
+            values[(name, object_id)] = value
+    return values
+
+
+def reconcile():
+    """Приводит таблицу счётчиков к точным значениям.
+
+    Возвращает число исправленных счётчиков.
+    """
+    actual = actual_values()
+    fixed = 0
+    for counter in Counter.objects.exclude(name=FEED_PULLED).iterator():
+        value = actual.pop((counter.name, counter.object_id), 0)
+        if counter.value != value:
+            Counter.objects.filter(pk=counter.pk).update(value=value)
+            fixed += 1
+    Counter.objects.bulk_create(
+        Counter(name=name, object_id=object_id, value=value)
+        for (name, object_id), value in actual.items()
+    )
+    return fixed + len(actual)
@@ -0,0 +1,252 @@
+import heapq
+import time
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import HIGH
+
+from . import counters
+from .models import LIST_FIELDS, Counter, Follow, Post, Timeline
+
+FANOUT_BATCH_SIZE: int = 500
+
+
+def is_pulled(author_id):
+    """Посты популярного автора не раскладываются по лентам,
+    а подмешиваются при чтении.
+    """
+    return Counter.objects.filter(
+        name=counters.FEED_PULLED, object_id=author_id).exists()
+
+
+def pulled_authors(user):
+    """Популярные авторы среди подписок пользователя."""
+    return list(Counter.objects.filter(
+        name=counters.FEED_PULLED,
+        object_id__in=Follow.objects.filter(user=user).values('author'),
+    ).values_list('object_id', flat=True))
+
+
+def update_pull_mode(author_id):
+    """Переключает автора между раскладкой и чтением при запросе.
+
+    В чтение при запросе автор переходит сразу, как только подписчиков
+    становится FEED_PULL_THRESHOLD. Обратно — только задачей
+    posts.push_author, которая сначала разложит вышедшие за это время
+    посты: до тех пор лента продолжает подмешивать их при чтении.
+    """
+    followers = counters.get(counters.USER_FOLLOWERS, author_id)
+    if followers >= settings.FEED_PULL_THRESHOLD:
+        Counter.objects.get_or_create(
+            name=counters.FEED_PULLED,
+            object_id=author_id,
+            defaults={'value': int(time.time())},
+        )
+    elif is_pulled(author_id):
+        jobs.enqueue(
+            'posts.push_author',
+            lane=HIGH,
+            dedup_key=f'push_author:{author_id}',
+            author_id=author_id,
+        )
+
+
+def push_author(author_id):
+    """Раскладывает посты, вышедшие, пока автор читался при запросе,
+    и возвращает его к обычной раскладке.
+    """
+    since = Counter.objects.filter(
+        name=counters.FEED_PULLED, object_id=author_id,
+    ).values_list('value', flat=True).first()
+    followers = counters.get(counters.USER_FOLLOWERS, author_id)
+    if since is None or followers >= settings.FEED_PULL_THRESHOLD:
+        return
+    started = timezone.now()
+    fill_followers(author_id, datetime.fromtimestamp(since, timezone.utc))
+    counters.drop(counters.FEED_PULLED, author_id)
+    # посты, вышедшие во время раскладки, ещё не попали в ленты
+    fill_followers(author_id, started)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        (
+            Timeline(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fill_timeline(user_id, author_id, since=None):
+    """Добавляет в ленту пользователя посты автора (начиная с since).
+
+    Ленту заполняем и для популярного автора: пока он читается при
+    запросе, её записи не используются, но понадобятся, когда
+    подписчиков станет меньше порога.
+    """
+    posts = Post.objects.filter(author_id=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gte=since)
+    Timeline.objects.bulk_create(
+        (
+            Timeline(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts.values_list(
+                'pk', 'pub_date').iterator()
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fill_followers(author_id, since):
+    """Добавляет посты автора начиная с since в ленты всех подписчиков."""
+    followers = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        fill_timeline(user_id, author_id, since)
+
+
+def schedule_fan_out(post):
+    """Раскладывает пост сразу или, если подписчиков много, в фоне."""
+    if is_pulled(post.author_id):
+        return
+    followers = counters.get(counters.USER_FOLLOWERS, post.author_id)
+    if followers <= settings.FEED_INLINE_FANOUT_LIMIT:
+        fan_out_post(post)
+    else:
+        jobs.enqueue(
+            'posts.fan_out',
+            lane=HIGH,
+            dedup_key=f'fan_out:{post.pk}',
+            post_id=post.pk,
+        )
+
+
+def schedule_fill_timeline(user_id, author_id):
+    """Заполняет ленту сразу или, если постов много, в фоне."""
+    posts = counters.get(counters.USER_POSTS, author_id)
+    if posts <= settings.FEED_INLINE_FANOUT_LIMIT:
+        fill_timeline(user_id, author_id)
+    else:
+        jobs.enqueue(
+            'posts.fill_timeline',
+            lane=HIGH,
+            dedup_key=f'fill_timeline:{user_id}:{author_id}',
+            user_id=user_id,
+            author_id=author_id,
+        )
+
+
+def clear_timeline(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_timeline(user_id):
+    """Пересобирает ленту пользователя по его текущим подпискам."""
+    Timeline.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True)
+    for author_id in authors:
+        fill_timeline(user_id, author_id)
+
+
+class TimelineStream:
+    """Посты ленты, прочитанные через строки Timeline.
+
+    Фильтры и порядок относятся к Timeline, поэтому страница берётся
+    из индекса (user, -pub_date, -post) и не требует сортировки.
+    Срез возвращает сами посты.
+    """
+
+    cursor_fields = ('pub_date', 'post_id')
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *args, **kwargs):
+        return TimelineStream(self.rows.filter(*args, **kwargs))
+
+    def exclude(self, *args, **kwargs):
+        return TimelineStream(self.rows.exclude(*args, **kwargs))
+
+    def reverse(self):
+        return TimelineStream(self.rows.reverse())
+
+    def count(self):
+        return self.rows.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self.rows[key].post
+        return [row.post for row in self.rows[key]]
+
+
+def timeline_posts(user):
+    """Посты из ленты подписок пользователя, от новых к старым."""
+    return TimelineStream(
+        Timeline.objects.filter(user=user)
+        .select_related('post__author', 'post__group')
+        .only('pub_date', 'post_id',
+              *(f'post__{name}' for name in LIST_FIELDS))
+        .order_by('-pub_date', '-post_id'))
+
+
+def sort_key(post):
+    return post.pub_date, post.pk
+
+
+class FollowFeed:
+    """Лента подписок: разложенные посты из Timeline, слитые на лету
+    с потоками популярных авторов.
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator.
+    """
+
+    def __init__(self, user):
+        pulled = pulled_authors(user)
+        self.streams = [timeline_posts(user).exclude(author_id__in=pulled)]
+        self.streams += [
+            Post.objects.for_list().filter(
+                author_id=author_id).order_by('-pub_date', '-pk')
+            for author_id in pulled
+        ]
+
+    def count(self):
+        return sum(stream.count() for stream in self.streams)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if len(self.streams) == 1:
+            return list(self.streams[0][key])
+        merged = heapq.merge(
+            *(stream[:key.stop] for stream in self.streams),
+            key=sort_key,
+            reverse=True,
+        )
+        return list(islice(merged, key.start, key.stop))
@@ -8,6 +8,16 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # отвергнутая при приёме картинка приходит пустым файлом,
+        # вместо общей ошибки поля показываем причину
+        error = getattr(self.files.get('image'), 'error', None)
+        if error:
+            self.errors.pop('image', None)
+            self.add_error('image', error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
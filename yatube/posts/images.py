@@ -0,0 +1,138 @@
+import hashlib
+import json
+
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core import jobs, storage
+from core.models import BULK, Blob
+from core.storage import content_storage
+
+from .models import Post
+
+# карточка поста: кадр 960x339 и лестница ширин для srcset
+CARD_SIZE = (960, 339)
+CARD_WIDTHS = (320, 480, 640, 960)
+CARD_SIZES = '(min-width: 992px) 720px, 100vw'
+
+# WebP для браузеров, которые его понимают, JPEG для остальных
+FORMATS = (
+    ('WEBP', 'image/webp'),
+    ('JPEG', 'image/jpeg'),
+)
+
+
+def card_geometry(width):
+    return f'{width}x{round(width * CARD_SIZE[1] / CARD_SIZE[0])}'
+
+
+THUMBNAILS = {
+    (image_format, width): (
+        card_geometry(width),
+        {'crop': 'center', 'upscale': True, 'format': image_format},
+    )
+    for image_format, _ in FORMATS
+    for width in CARD_WIDTHS
+}
+
+
+def content_hash(image):
+    digest = hashlib.sha256()
+    image.open('rb')
+    try:
+        for chunk in image.chunks():
+            digest.update(chunk)
+    finally:
+        image.close()
+    return digest.hexdigest()
+
+
+def process_image(image):
+    """Создаёт миниатюры и возвращает значения полей изображения Post."""
+    variants = {}
+    for (image_format, _), (geometry, options) in THUMBNAILS.items():
+        thumbnail = get_thumbnail(image, geometry, **options)
+        variants.setdefault(image_format, []).append(
+            [thumbnail.name, thumbnail.width, thumbnail.height])
+    return {
+        'image_width': image.width,
+        'image_height': image.height,
+        'image_hash': content_hash(image),
+        'image_variants': json.dumps(variants),
+    }
+
+
+def srcset(ladder):
+    return ', '.join(
+        f'{default.storage.url(name)} {width}w' for name, width, _ in ladder)
+
+
+def card_picture(post):
+    """Источники <picture> для карточки или None, пока миниатюры не готовы.
+
+    Собирается только из полей поста, без обращений к хранилищу.
+    Браузер сам выбирает наименьший подходящий вариант по srcset и sizes.
+    """
+    variants = post.variants
+    if not variants:
+        return None
+    sources = [
+        {'type': mime_type, 'srcset': srcset(variants[image_format])}
+        for image_format, mime_type in FORMATS
+    ]
+    name, width, height = variants[FORMATS[-1][0]][-1]
+    return {
+        'sources': sources[:-1],
+        'src': default.storage.url(name),
+        'srcset': sources[-1]['srcset'],
+        'sizes': CARD_SIZES,
+        'width': width,
+        'height': height,
+    }
+
+
+def forget_image(name):
+    """Удаляет миниатюры оригинала и записи о них в хранилище sorl."""
+    default.kvstore.delete(ImageFile(name, content_storage))
+
+
+def delete_image(name):
+    forget_image(name)
+    content_storage.delete(name)
+
+
+def forget_thumbnail(name):
+    """Убирает из хранилища sorl запись об удалённой миниатюре,
+    чтобы при следующем запросе она была создана заново.
+    """
+    default.kvstore.delete(
+        ImageFile(name, default.storage), delete_thumbnails=False)
+
+
+def release_image(name, count=1):
+    """Снимает ссылки на файл и ставит в очередь его уборку.
+
+    Задача выполняется с задержкой MEDIA_GC_DELAY и удаляет файл,
+    только если ссылок на него так и не появилось.
+    """
+    if not name:
+        return
+    storage.release(name, count)
+    jobs.enqueue(
+        'posts.collect_image',
+        lane=BULK,
+        delay=settings.MEDIA_GC_DELAY,
+        dedup_key=f'collect_image:{name}',
+        image=name,
+    )
+
+
+def collect_image(name):
+    """Удаляет файл без ссылок; возвращает число освобождённых байт."""
+    blob = Blob.objects.filter(name=name, refcount__lte=0).first()
+    if blob is None or Post.objects.filter(image=name).exists():
+        return 0
+    delete_image(name)
+    blob.delete()
+    return blob.size
@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import encode_cursor, encode_search_cursor
+
+NO_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def with_cursors(url, obj, field='pub_date'):
+    """Адрес первой страницы и курсорных страниц от записи obj."""
+    if obj is None:
+        return [url]
+    cursor = encode_cursor(obj, field)
+    return [url, f'{url}?after={cursor}', f'{url}?before={cursor}']
+
+
+def view_urls():
+    """Адреса страниц, собранные по первым попавшимся объектам.
+
+    Кроме первых страниц проверяются курсорные страницы списков,
+    догрузка комментариев и поиск.
+    """
+    posts = Post.objects.select_related('author')
+    urls = with_cursors(reverse('posts:index'), posts.first())
+    group = Group.objects.first()
+    if group:
+        urls += with_cursors(
+            reverse('posts:group_list', args=[group.slug]),
+            posts.filter(group=group).first())
+    post = posts.first()
+    if post:
+        urls += with_cursors(
+            reverse('posts:profile', args=[post.author.username]),
+            posts.filter(author=post.author).first())
+        urls.append(reverse('posts:post_detail', args=[post.pk]))
+    comment = Comment.objects.order_by('-created', '-pk').first()
+    if comment:
+        url = reverse('posts:post_comments', args=[comment.post_id])
+        cursor = encode_cursor(comment, 'created')
+        urls += [url, f'{url}?after={cursor}']
+    words = search.WORD_RE.findall(post.text) if post else []
+    if words:
+        url = f'{reverse("posts:search")}?{urlencode({"q": words[0]})}'
+        urls.append(url)
+        hits = search.ranked_ids(words[0], limit=1)
+        if hits:
+            urls.append(f'{url}&after={encode_search_cursor(*hits[0])}')
+    return urls
+
+
+def table_scans(sql, tables):
+    """Таблицы, которые план запроса читает целиком, без индекса."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for detail in plan:
+        words = detail.replace('SCAN TABLE', 'SCAN').split()
+        # поиск FTS5 по MATCH — «VIRTUAL TABLE INDEX 0:M1», без условия
+        # после двоеточия виртуальная таблица читается целиком
+        virtual = words[2:4] == ['VIRTUAL', 'TABLE']
+        if virtual and not words[-1].endswith(':'):
+            continue
+        if words[0] == 'SCAN' and 'USING' not in words:
+            if words[1] in tables:
+                scans.append(words[1])
+    return scans
+
+
+class Command(BaseCommand):
+    help = ('Проверяет планы запросов страниц постов '
+            'и падает, если какой-то из них сканирует таблицу.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Поддерживается только SQLite.')
+        tables = set(connection.introspection.table_names())
+        failures = []
+        # из кеша страница отдаётся без запросов, и проверять было бы
+        # нечего, поэтому кеш на время проверки отключён
+        with override_settings(CACHES=NO_CACHES), transaction.atomic():
+            client = Client()
+            pages = [(url, client) for url in view_urls()]
+            follow = Follow.objects.select_related('user').first()
+            if follow:
+                reader = Client()
+                reader.force_login(follow.user)
+                pages += [
+                    (url, reader) for url in with_cursors(
+                        reverse('posts:follow_index'),
+                        Post.objects.filter(author=follow.author).first())
+                ]
+            for url, page_client in pages:
+                with CaptureQueriesContext(connection) as queries:
+                    page_client.get(url)
+                for query in queries:
+                    if not query['sql'].startswith('SELECT'):
+                        continue
+                    for table in table_scans(query['sql'], tables):
+                        failures.append(f'{url}: {table}: {query["sql"]}')
+                self.stdout.write(f'{url}: запросов {len(queries)}')
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                'Запросы без индекса:\n' + '\n'.join(failures))
+        self.stdout.write('Все запросы используют индексы.')
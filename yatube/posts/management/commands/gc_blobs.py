@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import Blob
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из хранилища по содержимому файлы, на которые '
+            'не ссылается ни один пост.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=24,
+            help='Не трогать файлы моложе стольких часов: их пост '
+                 'может ещё сохраняться.',
+        )
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            help='Сначала пересчитать ссылки по таблице постов.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что было бы удалено.',
+        )
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            self.reconcile()
+        deadline = timezone.now() - timedelta(hours=options['grace'])
+        garbage = Blob.objects.filter(refcount__lte=0, created__lt=deadline)
+        count = size = 0
+        for blob in garbage.iterator():
+            # ссылка могла появиться после пересчёта
+            if Post.objects.filter(image=blob.name).exists():
+                continue
+            count += 1
+            size += blob.size
+            if not options['dry_run']:
+                images.delete_image(blob.name)
+                blob.delete()
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{action} файлов: {count}, байт: {size}')
+
+    def reconcile(self):
+        references = dict(
+            Post.objects.exclude(image='').values_list('image').annotate(
+                n=Count('pk')).order_by())
+        for blob in Blob.objects.iterator():
+            refcount = references.get(blob.name, 0)
+            if blob.refcount != refcount:
+                Blob.objects.filter(pk=blob.pk).update(refcount=refcount)
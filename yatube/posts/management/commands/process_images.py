@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core import jobs
+from core.models import BULK
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь миниатюры и сведения об изображениях '
+            'для постов, у которых их ещё нет.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(image_variants='')
+        count = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            jobs.enqueue(
+                'posts.thumbnails',
+                lane=BULK,
+                dedup_key=f'thumbnails:{post_id}',
+                post_id=post_id,
+            )
+            count += 1
+        self.stdout.write(f'Поставлено в очередь: {count}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import rebuild_timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Чьи ленты пересобрать (по умолчанию все).',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        count = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            rebuild_timeline(user_id)
+            count += 1
+        self.stdout.write(f'Пересобрано лент: {count}')
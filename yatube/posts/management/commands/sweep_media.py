@@ -0,0 +1,127 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from core.models import Blob
+from core.storage import content_storage
+from posts import images
+from posts.models import Post
+
+UPLOAD_DIR = Post._meta.get_field('image').upload_to.strip('/')
+
+
+def referenced_names():
+    """Все файлы, на которые ссылаются посты или счётчики ссылок."""
+    names = set(Blob.objects.filter(
+        refcount__gt=0).values_list('name', flat=True).iterator())
+    posts = Post.objects.exclude(image='').values_list(
+        'image', 'image_variants')
+    for image, variants in posts.iterator():
+        names.add(image)
+        for ladder in json.loads(variants or '{}').values():
+            names.update(name for name, _, _ in ladder)
+    return names
+
+
+def scan(directory, root, referenced, deadline, recursive=True):
+    """Файлы каталога, на которые никто не ссылается: [(имя, размер)]."""
+    found = []
+    for path, _, filenames in os.walk(directory):
+        for filename in filenames:
+            full_path = os.path.join(path, filename)
+            name = os.path.relpath(full_path, root).replace(os.sep, '/')
+            stat = os.stat(full_path)
+            # свежий файл может принадлежать ещё не сохранённому посту
+            if name not in referenced and stat.st_mtime < deadline:
+                found.append((name, stat.st_size))
+        if not recursive:
+            break
+    return found
+
+
+def scan_tasks(root, prefix):
+    """Каталог prefix без вложенных и каждый его подкаталог отдельно,
+    чтобы шарды просматривались параллельно.
+    """
+    top = os.path.join(root, prefix)
+    if not os.path.isdir(top):
+        return []
+    tasks = [(top, False)]
+    tasks += [(entry.path, True) for entry in os.scandir(top)
+              if entry.is_dir()]
+    return tasks
+
+
+class Command(BaseCommand):
+    help = ('Находит в MEDIA_ROOT оригиналы и миниатюры, на которые '
+            'не ссылается ни один пост, и удаляет их пачками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько места освободится.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Сколько потоков просматривают и удаляют файлы.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько файлов удалять за один проход.',
+        )
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=24,
+            help='Не трогать файлы моложе стольких часов.',
+        )
+
+    def handle(self, *args, **options):
+        root = content_storage.location
+        referenced = referenced_names()
+        deadline = time.time() - options['grace'] * 3600
+        thumbnail_prefix = thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+        tasks = (
+            scan_tasks(root, UPLOAD_DIR)
+            + scan_tasks(root, thumbnail_prefix))
+        with ThreadPoolExecutor(options['workers']) as executor:
+            orphans = [
+                item
+                for found in executor.map(
+                    lambda task: scan(
+                        task[0], root, referenced, deadline, task[1]),
+                    tasks,
+                )
+                for item in found
+            ]
+            size = sum(file_size for _, file_size in orphans)
+            if not options['dry_run']:
+                self.delete(executor, orphans, thumbnail_prefix, options)
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{action} файлов: {len(orphans)}, байт: {size}')
+
+    def delete(self, executor, orphans, thumbnail_prefix, options):
+        names = [name for name, _ in orphans]
+        batch_size = options['batch_size']
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            list(executor.map(content_storage.delete, batch))
+            # записи sorl и Blob правятся в основном потоке
+            for name in batch:
+                if name.startswith(thumbnail_prefix + '/'):
+                    images.forget_thumbnail(name)
+                else:
+                    images.forget_image(name)
+            Blob.objects.filter(name__in=batch).delete()
+            self.stdout.write(
+                f'Удалено {min(start + batch_size, len(names))} '
+                f'из {len(names)}')
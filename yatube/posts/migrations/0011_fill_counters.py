@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Counter = apps.get_model('posts', 'Counter')
+
+    counters = [Counter(name='posts', object_id=0, value=Post.objects.count())]
+    grouped = {
+        'user_posts': Post.objects.values_list('author'),
+        'user_followers': Follow.objects.values_list('author'),
+        'user_following': Follow.objects.values_list('user'),
+        'post_comments': Comment.objects.values_list('post'),
+        'group_posts': Post.objects.filter(
+            group__isnull=False).values_list('group'),
+    }
+    for name, queryset in grouped.items():
+        for object_id, value in queryset.annotate(n=Count('pk')).order_by():
+            counters.append(
+                Counter(name=name, object_id=object_id, value=value))
+    Counter.objects.bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
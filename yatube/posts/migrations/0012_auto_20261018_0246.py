@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:46
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """Удаляет повторные подписки и вычитает их из счётчиков,
+    заполненных в 0011 вместе с дублями.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Counter = apps.get_model('posts', 'Counter')
+    duplicates = list(
+        Follow.objects.values('user', 'author')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        Follow.objects.filter(
+            user=duplicate['user'], author=duplicate['author'],
+        ).exclude(id=duplicate['first_id']).delete()
+        extra = duplicate['total'] - 1
+        Counter.objects.filter(
+            name='user_followers', object_id=duplicate['author'],
+        ).update(value=F('value') - extra)
+        Counter.objects.filter(
+            name='user_following', object_id=duplicate['user'],
+        ).update(value=F('value') - extra)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_fill_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def mark_pulled_authors(apps, schema_editor):
+    """Авторы, которые уже читались при запросе, получают отметку:
+    иначе их посты, не разложенные по лентам, пропали бы из лент.
+    """
+    Counter = apps.get_model('posts', 'Counter')
+    authors = Counter.objects.filter(
+        name='user_followers',
+        value__gte=settings.FEED_PULL_THRESHOLD,
+    ).values_list('object_id', flat=True)
+    # с какого момента посты не раскладывались, неизвестно: value=0,
+    # и при выходе из режима в ленты доложатся все посты автора
+    Counter.objects.bulk_create(
+        (Counter(name='feed_pulled', object_id=author_id, value=0)
+         for author_id in authors),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_pulled_authors, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import content_storage
+
 User = get_user_model()
 
 VIEW_LENGTH = 15
@@ -24,6 +28,25 @@ class Group(models.Model):
         return self.title
 
 
+# поля, которые выводит карточка поста
+LIST_FIELDS = (
+    'id', 'text', 'pub_date', 'updated', 'image', 'image_width',
+    'image_height', 'image_variants',
+    'author', 'author__username',
+    'group', 'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def for_list(self):
+        """Поля, которые выводит карточка поста, одним запросом."""
+        return self.select_related('author', 'group').only(*LIST_FIELDS)
+
+    def for_detail(self):
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
 
     text = models.TextField(
@@ -31,6 +54,8 @@ class Post(models.Model):
 
     pub_date = models.DateTimeField(auto_now_add=True)
 
+    updated = models.DateTimeField(auto_now=True)
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -47,17 +72,61 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
 
+    # заполняются фоновой задачей posts.thumbnails, чтобы карточка
+    # собиралась из строки таблицы без обращений к хранилищу
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+
+    image_hash = models.CharField(max_length=64, blank=True)
+
+    image_variants = models.TextField(
+        blank=True,
+        help_text='JSON: формат -> [[имя файла, ширина, высота], ...]')
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # id в конце индекса: порядок (-pub_date, -id) курсорной
+            # пагинации читается из индекса без сортировки
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:VIEW_LENGTH]
 
+    @property
+    def variants(self):
+        return json.loads(self.image_variants) if self.image_variants else {}
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def for_post(self):
+        """Комментарии вместе с именами авторов, от новых к старым."""
+        return self.select_related('author').only(
+            'id', 'text', 'created', 'post', 'author', 'author__username',
+        ).order_by('-created', '-id')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -74,10 +143,18 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:VIEW_LENGTH]
@@ -98,6 +175,64 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:VIEW_LENGTH]
+
+
+class Timeline(models.Model):
+    """Лента подписок пользователя, заполняемая при публикации поста."""
+
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_post_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class Counter(models.Model):
+    """Денормализованный счётчик: постов, подписчиков, комментариев."""
+
+    name = models.CharField(max_length=32)
+    object_id = models.PositiveIntegerField()
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик'
+        verbose_name_plural = 'Счётчики'
+        unique_together = ('name', 'object_id')
+
+    def __str__(self):
+        return f'{self.name}:{self.object_id}={self.value}'
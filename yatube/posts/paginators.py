@@ -0,0 +1,278 @@
+import hashlib
+import heapq
+from itertools import islice
+from operator import attrgetter
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import DatabaseError, connection
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import search
+
+COUNT_CACHE_TIMEOUT: int = 60
+EXACT_COUNT_LIMIT: int = 10000
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Непрозрачный токен позиции записи в ленте."""
+    moment = getattr(obj, field)
+    return urlsafe_base64_encode(
+        force_bytes(f'{moment.isoformat()}|{obj.pk}'))
+
+
+def decode_cursor(token):
+    """Возвращает (момент, pk) или None для испорченного токена."""
+    if not token:
+        return None
+    try:
+        pub_date, pk = urlsafe_base64_decode(token).decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+def encode_search_cursor(rank, pk):
+    """Токен позиции в выдаче поиска: оценка релевантности и id."""
+    return urlsafe_base64_encode(force_bytes(f'{rank!r}|{pk}'))
+
+
+def decode_search_cursor(token):
+    """Возвращает (rank, pk) или None для испорченного токена."""
+    if not token:
+        return None
+    try:
+        rank, pk = urlsafe_base64_decode(token).decode().split('|')
+        return float(rank), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def seek(stream, cursor, newer, field='pub_date'):
+    """Записи потока строго старше (или новее) позиции курсора.
+
+    Условие записано как диапазон по первому полю ключа, поэтому
+    страница читается одним проходом по индексу (поле, id) без OR
+    и без сортировки. Поток может задать свои поля ключа в атрибуте
+    cursor_fields.
+    """
+    if cursor is None:
+        return stream
+    moment, pk = cursor
+    field, tiebreak = getattr(stream, 'cursor_fields', (field, 'pk'))
+    if newer:
+        return stream.filter(**{f'{field}__gte': moment}).exclude(
+            **{field: moment, f'{tiebreak}__lte': pk}).reverse()
+    return stream.filter(**{f'{field}__lte': moment}).exclude(
+        **{field: moment, f'{tiebreak}__gte': pk})
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос.
+
+    Число записей берётся из переданного счётчика или из кеша
+    на COUNT_CACHE_TIMEOUT секунд, а вместо всех номеров страниц
+    отдаётся короткое окно вокруг текущей.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key=None, count=None):
+        super().__init__(object_list, per_page)
+        self.count_key = count_key
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    def validate_number(self, number):
+        # счётчик может отставать, поэтому страницы за его пределами
+        # не отбрасываются, пока в них есть записи
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = self.object_list[bottom:bottom + self.per_page]
+        if number > 1 and not len(object_list):
+            raise EmptyPage('That page contains no results')
+        page = self._get_page(object_list, number, self)
+        page.elided_page_range = list(self.get_elided_page_range(number))
+        return page
+
+    def get_page(self, number):
+        # номер за концом ленты открывает последнюю непустую страницу;
+        # счётчик мог отстать от таблицы, поэтому записи пересчитываются
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            pass
+        self.known_count = None
+        if self.count_key is not None:
+            cache.delete(self.count_key)
+        self.__dict__.pop('count', None)
+        self.__dict__.pop('num_pages', None)
+        return self.page(self.num_pages)
+
+    def get_elided_page_range(self, number, on_each_side=2, on_ends=1):
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def table_row_estimate(model):
+    """Число строк таблицы по статистике ANALYZE или None без неё."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                [model._meta.db_table],
+            )
+            rows = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    return max(rows, default=None)
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Paginator для списков админки на больших таблицах.
+
+    Без фильтров число записей берётся из статистики sqlite_stat1.
+    С фильтрами записи считаются точно, но не дальше EXACT_COUNT_LIMIT;
+    большие числа кешируются по тексту запроса.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = table_row_estimate(queryset.model)
+            if estimate is not None:
+                return estimate
+        capped = queryset.order_by()[:EXACT_COUNT_LIMIT + 1].count()
+        if capped <= EXACT_COUNT_LIMIT:
+            return capped
+        if self.count_key is None:
+            self.count_key = 'admin:count:' + hashlib.md5(
+                force_bytes(str(queryset.query))).hexdigest()
+        return super().count
+
+
+class CursorPaginator(CachedCountPaginator):
+    """Пагинация по ключу (pub_date, id) вместо OFFSET.
+
+    Каждая страница — один ограниченный проход по индексу. Принимает
+    queryset постов, упорядоченный от новых к старым, или ленту
+    с атрибутом streams из нескольких таких querysets.
+    """
+
+    is_cursor = True
+    cursor_field = 'pub_date'
+
+    def __init__(self, object_list, per_page, after=None, before=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.after = after
+        self.before = before
+
+    def get_page(self, number=None):
+        newer = self.before is not None
+        cursor = decode_cursor(self.before if newer else self.after)
+        if cursor is None:
+            newer = False
+        field = self.cursor_field
+        streams = getattr(self.object_list, 'streams', [self.object_list])
+        merged = heapq.merge(
+            *(seek(s, cursor, newer, field)[:self.per_page + 1]
+              for s in streams),
+            key=attrgetter(field, 'pk'),
+            reverse=not newer,
+        )
+        posts = list(islice(merged, self.per_page + 1))
+        has_more = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        if newer:
+            posts.reverse()
+
+        page = Page(posts, 1, self)
+        page.after = self.after
+        page.before = self.before
+        older_exist = has_more if not newer else True
+        newer_exist = has_more if newer else cursor is not None
+        page.next_cursor = (
+            encode_cursor(posts[-1], field)
+            if posts and older_exist else None)
+        page.previous_cursor = (
+            encode_cursor(posts[0], field)
+            if posts and newer_exist else None)
+        return page
+
+
+class CommentPaginator(CursorPaginator):
+    """Пагинация комментариев по ключу (created, id)."""
+
+    cursor_field = 'created'
+
+
+class SearchPaginator(Paginator):
+    """Курсорная пагинация выдачи поиска по ключу (rank, id).
+
+    Порядок задаёт индекс FTS5, посты страницы догружаются
+    одним запросом по списку id.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, query, after=None):
+        super().__init__(object_list, per_page)
+        self.query = query
+        self.after = after
+
+    def get_page(self, number=None):
+        cursor = decode_search_cursor(self.after)
+        hits = search.ranked_ids(self.query, cursor, self.per_page + 1)
+        has_more = len(hits) > self.per_page
+        hits = hits[:self.per_page]
+        posts = self.object_list.in_bulk([pk for _, pk in hits])
+
+        page = Page([posts[pk] for _, pk in hits if pk in posts], 1, self)
+        page.after = self.after
+        page.before = None
+        page.next_cursor = (
+            encode_search_cursor(*hits[-1]) if has_more else None)
+        page.previous_cursor = None
+        return page
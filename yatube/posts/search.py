@@ -0,0 +1,93 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE: str = 'posts_post_fts'
+MAX_QUERY_WORDS: int = 10
+
+WORD_RE = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: все слова, по префиксу."""
+    words = WORD_RE.findall(query)[:MAX_QUERY_WORDS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE}(rowid, text) '
+            f'VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    unindex_posts([post_id])
+
+
+def unindex_posts(post_ids):
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})',
+            post_ids,
+        )
+
+
+def rebuild():
+    """Заново наполняет индекс из таблицы постов."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, text) '
+            f'SELECT id, text FROM posts_post')
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def ranked_ids(query, cursor=None, limit=10):
+    """Пары (rank, id) от самых релевантных, строго после cursor.
+
+    rank — оценка bm25 из FTS5: чем меньше, тем релевантнее.
+    """
+    match = match_expression(query)
+    if not match:
+        return []
+    sql = (f'SELECT rank, rowid FROM {SEARCH_TABLE} '
+           f'WHERE {SEARCH_TABLE} MATCH %s')
+    params = [match]
+    if cursor is not None:
+        rank, pk = cursor
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [rank, rank, pk]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        return db_cursor.fetchall()
+
+
+class IdSubquery(RawSQL):
+    """Сырой подзапрос id для filter(pk__in=...).
+
+    Lookup сам берёт правую часть в скобки, а RawSQL добавляет свои:
+    SQLite читает IN ((SELECT ...)) как скалярный подзапрос и берёт
+    только первую строку.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def matching_ids(query):
+    """Подзапрос id постов, подходящих под запрос, для filter(pk__in=...)."""
+    return IdSubquery(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        [match_expression(query)],
+    )
@@ -0,0 +1,134 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import jobs, storage
+
+from . import cache, counters, feed, images, search
+from .models import Comment, Follow, Group, Post, User
+
+
+def count_post(post, delta):
+    counters.increment(counters.POSTS, counters.SITE, delta)
+    counters.increment(counters.USER_POSTS, post.author_id, delta)
+    if post.group_id:
+        counters.increment(counters.GROUP_POSTS, post.group_id, delta)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    instance.previous_group_id = None
+    instance.previous_image = None
+    if instance.pk:
+        instance.previous_group_id, instance.previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image').first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, 'previous_group_id', None)
+    cache.bump(*cache.post_streams(instance, previous_group_id))
+    search.index_post(instance)
+    # у нового поста и поста без картинки имя пустое, а не None
+    previous_image = getattr(instance, 'previous_image', None) or ''
+    # окончательное имя файла известно только после сохранения:
+    # те же байты, загруженные заново, попадают в прежний файл
+    image_changed = (instance.image.name or '') != previous_image
+    if image_changed:
+        storage.acquire(instance.image.name)
+        images.release_image(previous_image)
+        # сведения о прежнем изображении больше не верны
+        instance.image_width = instance.image_height = None
+        instance.image_hash = instance.image_variants = ''
+        Post.objects.filter(pk=instance.pk).update(
+            image_width=None, image_height=None,
+            image_hash='', image_variants='')
+    if instance.image and image_changed:
+        # миниатюры готовятся заранее, а не при первом показе поста
+        jobs.enqueue(
+            'posts.thumbnails',
+            dedup_key=f'thumbnails:{instance.pk}',
+            post_id=instance.pk,
+        )
+    if created:
+        feed.schedule_fan_out(instance)
+        count_post(instance, 1)
+        return
+    if previous_group_id != instance.group_id:
+        if previous_group_id:
+            counters.increment(counters.GROUP_POSTS, previous_group_id, -1)
+        if instance.group_id:
+            counters.increment(counters.GROUP_POSTS, instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cache.bump(*cache.post_streams(instance))
+    search.unindex_post(instance.pk)
+    images.release_image(instance.image.name)
+    count_post(instance, -1)
+    counters.drop(counters.POST_COMMENTS, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    cache.bump(f'post:{instance.post_id}')
+    if created:
+        counters.increment(counters.POST_COMMENTS, instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cache.bump(f'post:{instance.post_id}')
+    counters.increment(counters.POST_COMMENTS, instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(counters.USER_FOLLOWERS, instance.author_id, 1)
+        counters.increment(counters.USER_FOLLOWING, instance.user_id, 1)
+        feed.update_pull_mode(instance.author_id)
+        feed.schedule_fill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.increment(counters.USER_FOLLOWERS, instance.author_id, -1)
+    counters.increment(counters.USER_FOLLOWING, instance.user_id, -1)
+    feed.update_pull_mode(instance.author_id)
+    feed.clear_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    # slug группы выводится в карточках постов на всех лентах
+    cache.bump('posts', f'group:{instance.pk}')
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # страница группы должна перестать отдаваться из кеша,
+    # а посты из неё — ссылаться на группу
+    cache.bump('posts', f'group:{instance.pk}')
+    counters.drop(counters.GROUP_POSTS, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # вход пользователя сохраняет только last_login
+    if created or (update_fields and 'username' not in update_fields):
+        return
+    cache.bump('posts', f'author:{instance.pk}')
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cache.bump('posts', f'author:{instance.pk}')
+    for name in (
+        counters.USER_POSTS,
+        counters.USER_FOLLOWERS,
+        counters.USER_FOLLOWING,
+        counters.FEED_PULLED,
+    ):
+        counters.drop(name, instance.pk)
@@ -0,0 +1,83 @@
+from django.utils import timezone
+
+from core import jobs
+from users import deletion
+
+from . import bulk, cache, feed, images
+from .models import Follow, Post
+
+
+def run_chunks(job, queryset, operation, done=0):
+    """Выполняет operation пачками, сохраняя прогресс после каждой."""
+    for chunk in bulk.chunked_ids(queryset):
+        operation(chunk)
+        done += len(chunk)
+        job.report(done)
+    return done
+
+
+@jobs.task('posts.regroup')
+def regroup(job, selection, group_id):
+    posts = bulk.selected_posts(selection)
+    job.report(0, posts.count())
+    run_chunks(
+        job, posts, lambda chunk: bulk.regroup_posts(chunk, group_id))
+
+
+@jobs.task('posts.delete')
+def delete(job, selection):
+    posts = bulk.selected_posts(selection)
+    job.report(0, posts.count())
+    run_chunks(job, posts, bulk.delete_posts)
+
+
+@jobs.task('posts.purge_authors')
+def purge_authors(job, selection):
+    """Удаляет авторов выбранных постов со всеми их постами
+    и комментариями.
+    """
+    author_ids = list(bulk.selected_posts(selection).order_by().values_list(
+        'author_id', flat=True).distinct())
+    total = sum(deletion.remaining(author_id) for author_id in author_ids)
+    job.report(0, total + len(author_ids))
+    done = 0
+    for author_id in author_ids:
+        for _, count in deletion.delete_user(author_id):
+            done += count
+            job.report(done)
+
+
+@jobs.task('posts.fan_out')
+def fan_out(job, post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out_post(post)
+
+
+@jobs.task('posts.fill_timeline')
+def fill_timeline(job, user_id, author_id):
+    # пока задача ждала, пользователь мог отписаться
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        feed.fill_timeline(user_id, author_id)
+
+
+@jobs.task('posts.push_author')
+def push_author(job, author_id):
+    feed.push_author(author_id)
+
+
+@jobs.task('posts.thumbnails')
+def thumbnails(job, post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    fields = images.process_image(post.image)
+    # карточки и страницы с оригиналом вместо миниатюры устарели
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        updated=timezone.now(), **fields)
+    cache.bump(*cache.post_streams(post))
+
+
+@jobs.task('posts.collect_image')
+def collect_image(job, image):
+    images.collect_image(image)
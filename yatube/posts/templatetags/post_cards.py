@@ -0,0 +1,47 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TIMEOUT: int = 60 * 60 * 24
+
+
+def card_key(post, view_group_link, secret_author_link):
+    version = post.updated.timestamp()
+    flags = f'{int(view_group_link)}{int(secret_author_link)}'
+    # имя автора и slug группы меняются без правки поста
+    links = hashlib.md5(
+        f'{post.author.username}|{post.group.slug if post.group else ""}'
+        .encode()).hexdigest()
+    return f'card:{post.pk}:{version}:{flags}:{links}'
+
+
+@register.simple_tag
+def post_cards(posts, view_group_link=False, secret_author_link=False):
+    """Отрисованные карточки постов страницы.
+
+    Каждая карточка кешируется по id и времени изменения поста,
+    все карточки страницы читаются из кеша одним get_many.
+    """
+    posts = list(posts)
+    keys = [
+        card_key(post, view_group_link, secret_author_link)
+        for post in posts
+    ]
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = get_template('includes/post.html')
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = cards[key] = card_template.render({
+                'post': post,
+                'view_group_link': view_group_link,
+                'secret_author_link': secret_author_link,
+            })
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
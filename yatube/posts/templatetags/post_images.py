@@ -0,0 +1,15 @@
+from django import template
+
+from posts import images
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_picture(post):
+    """Адаптивное изображение карточки, если миниатюры уже созданы."""
+    return {
+        'post': post,
+        'picture': images.card_picture(post),
+        'ratio': '{} / {}'.format(*images.CARD_SIZE),
+    }
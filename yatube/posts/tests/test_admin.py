@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import paginators
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class AdminChangelistTests(TestCase):
+    """Списки админки не зависят от числа строк в таблицах."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(5):
+            author = User.objects.create_user(username=f'Author{i}')
+            Follow.objects.create(user=cls.admin, author=author)
+            post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=cls.group)
+            Comment.objects.create(post=post, author=author, text='Ок')
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_changelists_filter_by_username(self):
+        """Фильтр по автору задаётся именем, а не списком всех авторов."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                response = self.admin_client.get(
+                    reverse(f'admin:posts_{model}_changelist'),
+                    {'author': 'Author1'},
+                )
+                self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_comment_search_by_post_id(self):
+        """Число в поиске комментариев — номер поста."""
+        post = Post.objects.first()
+        response = self.admin_client.get(
+            reverse('admin:posts_comment_changelist'), {'q': str(post.pk)})
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            list(post.comments.all()),
+        )
+
+    def test_post_search_finds_every_match(self):
+        """Поиск постов по индексу находит все совпадения, а не первое."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'пост'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_unfiltered_count_from_statistics(self):
+        """Без фильтров число строк берётся из sqlite_stat1."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = paginators.EstimatedCountPaginator(
+            Post.objects.all(), 10)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 5)
+
+    def test_filtered_count_is_capped(self):
+        """Большие отфильтрованные списки считаются один раз и кешируются."""
+        queryset = Post.objects.filter(group=self.group)
+        with mock.patch.object(paginators, 'EXACT_COUNT_LIMIT', 2):
+            paginator = paginators.EstimatedCountPaginator(queryset, 10)
+            self.assertEqual(paginator.count, 5)
+        self.assertIsNotNone(paginator.count_key)
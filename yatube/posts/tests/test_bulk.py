@@ -0,0 +1,157 @@
+import json
+from io import StringIO
+
+from django.contrib.admin import helpers
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import DONE, Job
+from posts import counters, search
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class BulkActionsTests(TestCase):
+    """Массовые действия админки выполняются фоновой задачей."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass')
+        cls.spammer = User.objects.create_user(username='Spammer')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.old_group = Group.objects.create(title='Старая', slug='old')
+        cls.new_group = Group.objects.create(title='Новая', slug='new')
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.posts = [
+            Post.objects.create(
+                text=f'Спам {i}', author=self.spammer, group=self.old_group)
+            for i in range(3)
+        ]
+        self.reader_post = Post.objects.create(
+            text='Обычный пост', author=self.reader)
+        Comment.objects.create(
+            post=self.reader_post, author=self.spammer, text='Спам')
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Ответ')
+        Follow.objects.create(user=self.reader, author=self.spammer)
+
+    def run_action(self, action, **data):
+        self.admin_client.post(reverse('admin:posts_post_changelist'), {
+            'action': action,
+            'index': 0,
+            helpers.ACTION_CHECKBOX_NAME: [post.pk for post in self.posts],
+            **data,
+        })
+        call_command('run_jobs', '--once', stdout=StringIO())
+        job = Job.objects.get()
+        self.assertEqual(job.status, DONE, job.error)
+        return job
+
+    def test_regroup(self):
+        """Посты переносятся, счётчики групп пересчитываются."""
+        self.admin_client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'regroup_posts',
+            'index': 0,
+            helpers.ACTION_CHECKBOX_NAME: [post.pk for post in self.posts],
+        })
+        self.assertFalse(Job.objects.exists())
+        self.admin_client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'regroup_posts',
+            'apply': 'Перенести',
+            'select_across': 0,
+            'group': self.new_group.pk,
+            helpers.ACTION_CHECKBOX_NAME: [post.pk for post in self.posts],
+        })
+        call_command('run_jobs', '--once', stdout=StringIO())
+        job = Job.objects.get()
+        self.assertEqual((job.done, job.total), (3, 3))
+        self.assertEqual(self.new_group.posts.count(), 3)
+        self.assertEqual(
+            counters.get(counters.GROUP_POSTS, self.old_group.pk), 0)
+        self.assertEqual(
+            counters.get(counters.GROUP_POSTS, self.new_group.pk), 3)
+
+    def test_regroup_refreshes_cards(self):
+        """Перенесённый пост не показывается из кеша со старой группой."""
+        self.client.get(reverse('posts:index'))
+        self.run_action(
+            'regroup_posts', apply='Перенести', group=self.new_group.pk)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(
+            response,
+            reverse('posts:group_list', args=[self.old_group.slug]))
+        self.assertContains(
+            response,
+            reverse('posts:group_list', args=[self.new_group.slug]))
+
+    def test_select_across_stores_filter(self):
+        """«Выбрать все» сохраняет в задаче условие, а не список id."""
+        self.admin_client.post(
+            reverse('admin:posts_post_changelist')
+            + f'?author={self.spammer.username}',
+            {
+                'action': 'delete_posts',
+                'index': 0,
+                'select_across': 1,
+                helpers.ACTION_CHECKBOX_NAME: [self.posts[0].pk],
+            },
+        )
+        job = Job.objects.get()
+        self.assertNotIn('post_ids', job.payload)
+        call_command('run_jobs', '--once', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done, job.total), (DONE, 3, 3))
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+
+    def test_selection_is_bounded_at_enqueue(self):
+        """Посты, добавленные после подтверждения, не удаляются."""
+        self.admin_client.post(
+            reverse('admin:posts_post_changelist')
+            + f'?author={self.spammer.username}',
+            {
+                'action': 'delete_posts',
+                'index': 0,
+                'select_across': 1,
+                helpers.ACTION_CHECKBOX_NAME: [self.posts[0].pk],
+            },
+        )
+        late_post = Post.objects.create(text='Позже', author=self.spammer)
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(author=self.spammer)), [late_post])
+
+    def test_checked_posts_stored_as_ids(self):
+        """Без «выбрать все» задача получает список отмеченных id."""
+        self.admin_client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_posts',
+            'index': 0,
+            'select_across': 0,
+            helpers.ACTION_CHECKBOX_NAME: [self.posts[0].pk],
+        })
+        payload = json.loads(Job.objects.get().payload)
+        self.assertEqual(payload['selection'], {'ids': [self.posts[0].pk]})
+
+    def test_delete_posts(self):
+        """Удаление убирает посты, комментарии, счётчики и индекс."""
+        self.run_action('delete_posts')
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(counters.get(counters.POSTS), 1)
+        self.assertEqual(counters.get(counters.USER_POSTS, self.spammer.pk), 0)
+        self.assertEqual(search.ranked_ids('спам'), [])
+
+    def test_purge_authors(self):
+        """Автор удаляется со всем, что написал, и из чужих подписок."""
+        self.run_action('purge_authors')
+        self.assertFalse(User.objects.filter(pk=self.spammer.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertFalse(self.reader_post.comments.exists())
+        self.assertEqual(
+            counters.get(counters.POST_COMMENTS, self.reader_post.pk), 0)
+        self.assertEqual(
+            counters.get(counters.USER_FOLLOWING, self.reader.pk), 0)
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.models import Comment, Counter, Follow, Group, Post, User
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='test-slug',
+            description='Описание',
+        )
+
+    def test_post_counters(self):
+        """Создание и удаление поста меняют счётчики постов."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, group=self.group)
+        self.assertEqual(counters.get(counters.POSTS), 1)
+        self.assertEqual(counters.get(counters.USER_POSTS, self.user.pk), 1)
+        self.assertEqual(
+            counters.get(counters.GROUP_POSTS, self.group.pk), 1)
+        post.delete()
+        self.assertEqual(counters.get(counters.USER_POSTS, self.user.pk), 0)
+        self.assertEqual(
+            counters.get(counters.GROUP_POSTS, self.group.pk), 0)
+
+    def test_post_group_change(self):
+        """Смена группы переносит пост в счётчике групп."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, group=self.group)
+        post.group = None
+        post.save()
+        self.assertEqual(
+            counters.get(counters.GROUP_POSTS, self.group.pk), 0)
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки ведут свои счётчики."""
+        post = Post.objects.create(text='Пост', author=self.user)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(counters.get(counters.POST_COMMENTS, post.pk), 1)
+        self.assertEqual(
+            counters.get(counters.USER_FOLLOWERS, self.user.pk), 1)
+        self.assertEqual(
+            counters.get(counters.USER_FOLLOWING, self.reader.pk), 1)
+
+    def test_reconcile_counters_command(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Post.objects.create(text='Пост', author=self.user)
+        Counter.objects.filter(name=counters.USER_POSTS).update(value=7)
+        Post.objects.bulk_create([Post(text='Без сигнала', author=self.user)])
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(counters.get(counters.USER_POSTS, self.user.pk), 2)
+        self.assertEqual(counters.get(counters.POSTS), 2)
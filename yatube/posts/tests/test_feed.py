@@ -0,0 +1,135 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Job
+from posts import feed
+from posts.models import Follow, Post, Timeline, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_follow_fills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=self.post).exists())
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, self.post])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка очищает ленту от постов автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Timeline.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=self.post).exists())
+
+
+@override_settings(FEED_PULL_THRESHOLD=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create_user(username='Star')
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.fan = User.objects.create_user(username='Fan')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_popular_author_is_not_fanned_out(self):
+        """Посты популярного автора не раскладываются по лентам."""
+        Post.objects.create(text='Пост звезды', author=self.star)
+        self.assertFalse(Timeline.objects.filter(author=self.star).exists())
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента сливает разложенные посты и посты популярных авторов."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author)
+            for i, author in enumerate(
+                [self.author, self.star, self.author, self.star])
+        ]
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, len(posts))
+        self.assertEqual(list(page_obj), posts[::-1])
+
+    def test_author_leaving_pull_mode_is_backfilled(self):
+        """Посты, вышедшие в режиме чтения, остаются в ленте подписчика
+        после того, как подписчиков стало меньше порога.
+        """
+        newcomer = User.objects.create_user(username='Newcomer')
+        Follow.objects.create(user=newcomer, author=self.star)
+        post = Post.objects.create(text='Пост звезды', author=self.star)
+        Follow.objects.filter(user=self.fan).delete()
+        Follow.objects.get(user=newcomer).delete()
+
+        # пока раскладка не прошла, автор читается при запросе
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertEqual(Job.objects.get().name, 'posts.push_author')
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertFalse(feed.is_pulled(self.star.pk))
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=post).exists())
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        later = Post.objects.create(text='Уже разложен', author=self.star)
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=later).exists())
+
+
+@override_settings(FEED_INLINE_FANOUT_LIMIT=1)
+class DeferredFanOutTests(TestCase):
+    """Большие раскладки уходят в фоновую задачу."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        for i in range(2):
+            reader = User.objects.create_user(username=f'Reader{i}')
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def test_fan_out_runs_in_worker(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(Job.objects.get().name, 'posts.fan_out')
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertEqual(Timeline.objects.filter(post=post).count(), 2)
@@ -1,11 +1,17 @@
+import hashlib
 import shutil
+import struct
 import tempfile
+import zlib
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, ImageFile
 
 from ..models import Group, Post, Comment
 
@@ -89,6 +95,7 @@ class PostFormTests(TestCase):
             b'\x00\x00\x01\x00\x01\x00\x00\x02'
             b'\x02\x4c\x01\x00\x3b'
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
         uploaded = SimpleUploadedFile(
             name='small.gif',
             content=small_gif,
@@ -114,7 +121,7 @@ class PostFormTests(TestCase):
                 text=form_data["text"],
                 group=form_data["group"],
                 author=self.user,
-                image='posts/small.gif',
+                image=f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif',
             ).exists())
 
     def test_create_post_with_guest(self):
@@ -230,3 +237,70 @@ class PostFormTests(TestCase):
         self.assertEqual(comment.text, form_data['text'])
         self.assertEqual(comment.post, PostFormTests.post)
         self.assertEqual(comment.author, PostFormTests.user)
+
+
+def png(size=(50, 50), header_size=None):
+    """PNG-файл; header_size подменяет размер в заголовке IHDR."""
+    buffer = BytesIO()
+    Image.new('RGB', size).save(buffer, 'PNG')
+    data = buffer.getvalue()
+    if header_size:
+        ihdr = b'IHDR' + struct.pack('>II', *header_size) + data[24:29]
+        data = (data[:12] + ihdr
+                + struct.pack('>I', zlib.crc32(ihdr)) + data[33:])
+    return data
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    """Картинка проверяется и хешируется ещё при приёме запроса."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='image.png'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, content, 'image/png'),
+        })
+
+    def test_hash_computed_while_streaming(self):
+        content = png()
+        digest = hashlib.sha256(content).hexdigest()
+        with mock.patch('core.storage.content_digest') as content_digest:
+            self.upload(content)
+        content_digest.assert_not_called()
+        self.assertEqual(
+            Post.objects.get().image.name,
+            f'posts/{digest[:2]}/{digest[2:4]}/{digest}.png')
+
+    def test_rejected_uploads(self):
+        cases = {
+            'bomb': (png(header_size=(10000, 10000)), 'слишком велико'),
+            'not_image': (b'<?php echo 1;', 'не похож на изображение'),
+            'big_file': (png(size=(300, 300)) + b'\0' * 2048, 'Файл больше'),
+        }
+        for case, (content, error) in cases.items():
+            with self.subTest(case=case), override_settings(
+                    POST_IMAGE_MAX_SIZE=2048):
+                response = self.upload(content)
+                self.assertFalse(Post.objects.exists())
+                self.assertIn(
+                    error, response.context['form'].errors['image'][0])
+
+    def test_header_read_without_decoding(self):
+        content = png(header_size=(10000, 10000))
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            self.upload(content)
+        load.assert_not_called()
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.kvstores.base import KVStoreBase as KVStore
+
+from core.models import Blob, Job
+from core.storage import content_storage
+from posts import images
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.jpg', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    """Миниатюры создаются фоновой задачей после загрузки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_thumbnails_generated_off_request(self):
+        """До задачи выводится оригинал, после — готовая миниатюра."""
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой', 'image': make_image()})
+        post = Post.objects.get()
+        self.assertEqual(Job.objects.get().name, 'posts.thumbnails')
+        self.assertIsNone(images.card_picture(post))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+        post.refresh_from_db()
+        picture = images.card_picture(post)
+        self.assertEqual((picture['width'], picture['height']), (960, 339))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, picture['src'])
+        self.assertNotContains(response, post.image.url)
+
+    def test_srcset_ladder(self):
+        """Для каждой ширины лестницы есть WebP и JPEG нужного размера."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image())
+        call_command('run_jobs', '--once', stdout=StringIO())
+        post.refresh_from_db()
+        picture = images.card_picture(post)
+        (webp,) = picture['sources']
+        self.assertEqual(webp['type'], 'image/webp')
+        for srcset, extension in ((webp['srcset'], '.webp'),
+                                  (picture['srcset'], '.jpg')):
+            candidates = [item.split() for item in srcset.split(', ')]
+            self.assertEqual(
+                [width for _, width in candidates],
+                [f'{width}w' for width in images.CARD_WIDTHS],
+            )
+            for url, _ in candidates:
+                self.assertTrue(url.endswith(extension))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'sizes="{images.CARD_SIZES}"')
+
+    def test_edit_without_new_image_keeps_thumbnails(self):
+        """Правка текста не ставит миниатюры в очередь заново."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image())
+        Job.objects.all().delete()
+        post.text = 'Новый текст'
+        post.save()
+        self.assertFalse(Job.objects.exists())
+
+    def test_post_without_image_skips_image_reset(self):
+        """Пост без картинки не сбрасывает сведения об изображении."""
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.create(text='Пост', author=self.user)
+        self.assertFalse([
+            query for query in queries
+            if 'image_width' in query['sql']
+            and query['sql'].startswith('UPDATE')
+        ])
+
+    def test_same_image_uploaded_again_keeps_thumbnails(self):
+        """Повторная загрузка тех же байтов не сбрасывает миниатюры."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image())
+        call_command('run_jobs', '--once', stdout=StringIO())
+        post.refresh_from_db()
+        variants = post.image_variants
+        self.assertTrue(variants)
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Пост', 'image': make_image('b.jpg')},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, variants)
+        self.assertFalse(Job.objects.filter(status='pending').exists())
+
+    def test_image_fields_stored_on_post(self):
+        """Размеры, хеш и варианты лежат в строке поста."""
+        upload = make_image()
+        post = Post.objects.create(text='Пост', author=self.user, image=upload)
+        call_command('run_jobs', '--once', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1200, 800))
+        digest = hashlib.sha256(upload.file.getvalue()).hexdigest()
+        self.assertEqual(post.image_hash, digest)
+        self.assertEqual(
+            sorted(post.variants), sorted(fmt for fmt, _ in images.FORMATS))
+
+        post.image = make_image('other.jpg', size=(600, 400))
+        post.save()
+        self.assertEqual(post.variants, {})
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+
+    def test_render_skips_storage(self):
+        """Карточка с готовыми миниатюрами не обращается к хранилищу."""
+        Post.objects.create(text='Пост', author=self.user, image=make_image())
+        call_command('run_jobs', '--once', stdout=StringIO())
+        cache.clear()
+        untouchable = mock.Mock(side_effect=AssertionError('storage'))
+        storage = mock.patch.multiple(
+            FileSystemStorage,
+            exists=untouchable,
+            open=untouchable,
+            size=untouchable,
+        )
+        with storage, mock.patch.object(KVStore, 'get', untouchable):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BlobStorageTests(TestCase):
+    """Одинаковые картинки хранятся один раз и удаляются без ссылок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_blobs', '--grace=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reposts_share_file_until_last_deleted(self):
+        first = Post.objects.create(
+            text='Мем', author=self.user, image=make_image())
+        second = Post.objects.create(
+            text='Тот же мем', author=self.user, image=make_image())
+        self.assertEqual(first.image.name, second.image.name)
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+
+        first.delete()
+        self.assertIn('файлов: 0', self.gc())
+        second.image = make_image(size=(10, 10))
+        second.save()
+        self.assertIn('Будет удалено файлов: 1', self.gc('--dry-run'))
+        self.assertTrue(content_storage.exists(blob.name))
+        self.gc()
+        self.assertFalse(content_storage.exists(blob.name))
+        self.assertEqual(
+            list(Blob.objects.values_list('name', 'refcount')),
+            [(second.image.name, 1)])
+
+    def test_reconcile(self):
+        post = Post.objects.create(
+            text='Мем', author=self.user, image=make_image())
+        Blob.objects.update(refcount=0)
+        self.gc('--reconcile')
+        self.assertTrue(content_storage.exists(post.image.name))
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class OrphanMediaTests(TestCase):
+    """Осиротевшие оригиналы и миниатюры убираются."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command('sweep_media', '--grace=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_replaced_image_collected_with_thumbnails(self):
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image())
+        old = post.image.name
+        Post.objects.filter(pk=post.pk).update(
+            **images.process_image(post.image))
+        post.refresh_from_db()
+        thumbnails = [
+            name for ladder in post.variants.values()
+            for name, _, _ in ladder]
+        self.assertTrue(thumbnails)
+
+        post.image = make_image(size=(10, 10))
+        post.save()
+        job = Job.objects.get(name='posts.collect_image')
+        self.assertEqual(json.loads(job.payload), {'image': old})
+        self.assertGreater(job.run_after, job.created)
+
+        self.assertGreater(images.collect_image(old), 0)
+        self.assertFalse(content_storage.exists(old))
+        for name in thumbnails:
+            self.assertFalse(content_storage.exists(name))
+        self.assertFalse(Blob.objects.filter(name=old).exists())
+
+    def test_collect_keeps_reacquired_image(self):
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image())
+        name = post.image.name
+        post.delete()
+        Post.objects.create(
+            text='Снова', author=self.user, image=make_image())
+        self.assertEqual(images.collect_image(name), 0)
+        self.assertTrue(content_storage.exists(name))
+
+    def test_sweep_removes_unreferenced_files(self):
+        # файлы прошлых тестов переживают откат транзакции
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image())
+        Post.objects.filter(pk=post.pk).update(
+            **images.process_image(post.image))
+        plain = FileSystemStorage()
+        orphan = plain.save('posts/ab/cd/orphan.gif', BytesIO(b'GIF89a'))
+        stale = plain.save('cache/00/11/stale.jpg', BytesIO(b'x' * 10))
+
+        self.assertIn('Будет удалено файлов: 2', self.sweep('--dry-run'))
+        self.assertTrue(content_storage.exists(orphan))
+        self.assertIn('Удалено файлов: 2, байт: ', self.sweep())
+        self.assertFalse(content_storage.exists(orphan))
+        self.assertFalse(content_storage.exists(stale))
+        self.assertTrue(content_storage.exists(post.image.name))
+        self.assertIn('файлов: 0', self.sweep())
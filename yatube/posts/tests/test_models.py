@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
 from django.test import TestCase
+from django.urls import reverse
 
-from ..models import Group, Post, Comment
+from ..models import Group, Post, Comment, Follow
 
 User = get_user_model()
 
@@ -87,3 +92,48 @@ class CommentModelTest(TestCase):
 
         expected_object_name = comment.text[:POST_TITLE_LENGHT]
         self.assertEqual(str(comment), expected_object_name)
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц постов используют индексы."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def test_check_query_plans_command(self):
+        """Команда check_query_plans не находит сканирований таблиц."""
+        # прогретый кеш не должен скрывать запросы от проверки
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('Все запросы используют индексы.', out.getvalue())
+        self.assertNotIn('запросов 0', out.getvalue())
+        pages = [
+            reverse('posts:index') + '?after=',
+            reverse('posts:follow_index') + '?before=',
+            reverse('posts:post_comments', args=[self.post.pk]) + '?after=',
+            reverse('posts:search') + '?q=',
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertIn(page, out.getvalue())
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора невозможна."""
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.reader, author=self.user)
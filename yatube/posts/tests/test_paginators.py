@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.feed import timeline_posts
+from posts.models import Comment, Post, User
+from posts.paginators import CachedCountPaginator, seek
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(3))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """Число записей считается один раз и берётся из кеша."""
+        CachedCountPaginator(Post.objects.all(), 1, 'test:count').count
+        with self.assertNumQueries(0):
+            paginator = CachedCountPaginator(
+                Post.objects.all(), 1, 'test:count')
+            self.assertEqual(paginator.count, 3)
+
+    def test_known_count_skips_query(self):
+        """Переданный счётчик заменяет COUNT(*)."""
+        with self.assertNumQueries(0):
+            paginator = CachedCountPaginator(
+                Post.objects.all(), 10, count=1000)
+            self.assertEqual(paginator.num_pages, 100)
+
+    def test_elided_page_range(self):
+        """Вместо всех номеров страниц выводится короткое окно."""
+        paginator = CachedCountPaginator(Post.objects.all(), 10, count=1000)
+        ellipsis = CachedCountPaginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100],
+        )
+
+    def test_stale_count_keeps_page(self):
+        """Устаревший счётчик не обрезает страницу."""
+        paginator = CachedCountPaginator(Post.objects.all(), 2, count=1)
+        self.assertEqual(len(paginator.get_page(2)), 1)
+
+    def test_stale_count_past_end(self):
+        """Завышенный счётчик не ведёт на пустую страницу."""
+        paginator = CachedCountPaginator(Post.objects.all(), 2, count=10)
+        page = paginator.get_page(99)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 1)
+
+
+class SeekPlanTests(TestCase):
+    """Страница после курсора читается из индекса без сортировки."""
+
+    def explain(self, stream):
+        stream = getattr(stream, 'rows', stream)
+        sql, params = stream[:11].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_no_temp_b_tree(self):
+        user = User(pk=1)
+        streams = {
+            'index': Post.objects.for_list(),
+            'author': Post.objects.for_list().filter(author=user),
+            'group': Post.objects.for_list().filter(group_id=1),
+            'follow': timeline_posts(user),
+            'comments': Comment.objects.for_post().filter(post_id=1),
+        }
+        cursor = (timezone.now(), 100)
+        for name, stream in streams.items():
+            field = 'created' if name == 'comments' else 'pub_date'
+            for newer in (False, True):
+                with self.subTest(stream=name, newer=newer):
+                    plan = self.explain(seek(stream, cursor, newer, field))
+                    # диапазон по дате внутри индекса, а не перебор
+                    self.assertRegex(
+                        plan, rf'INDEX \w+ \((\w+=\? AND )?{field}[<>]\?\)')
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    self.assertNotIn('MULTI-INDEX OR', plan)
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+from posts.views import VISIBLE_POSTCOUNT
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(
+            text='Кот сидит на окне', author=cls.author)
+
+    def found(self, query):
+        return [pk for _, pk in search.ranked_ids(query, limit=100)]
+
+    def test_index_follows_saves_and_deletes(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        post = Post.objects.create(text='Кот у двери', author=self.author)
+        self.assertIn(post.pk, self.found('кот'))
+        post.text = 'Пёс у двери'
+        post.save()
+        self.assertNotIn(post.pk, self.found('кот'))
+        self.assertEqual(self.found('пёс'), [post.pk])
+        post.delete()
+        self.assertEqual(self.found('пёс'), [])
+
+    def test_ranking_and_prefix(self):
+        """Более релевантный пост выше, слова ищутся по префиксу."""
+        best = Post.objects.create(
+            text='Котики, коты и снова кот', author=self.author)
+        self.assertEqual(self.found('кот'), [best.pk, self.post.pk])
+
+    def test_query_syntax_is_escaped(self):
+        """Служебные символы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.found('кот" OR *'), [])
+        self.assertEqual(self.found('"(кот'), [self.post.pk])
+
+    def test_rebuild_command(self):
+        """Команда пересобирает индекс, даже если он отстал от базы."""
+        Post.objects.filter(pk=self.post.pk).update(text='Попугай')
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(self.found('попугай'), [self.post.pk])
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass')
+        Post.objects.bulk_create(
+            Post(text=f'Кот номер {i}', author=cls.author)
+            for i in range(VISIBLE_POSTCOUNT + 3)
+        )
+        search.rebuild()
+        Post.objects.create(text='Пёс', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_search_pages(self):
+        """Выдача разбита на страницы курсором без повторов."""
+        url = reverse('posts:search')
+        first = self.client.get(url, {'q': 'кот'}).context['page_obj']
+        self.assertEqual(len(first), VISIBLE_POSTCOUNT)
+        self.assertIsNotNone(first.next_cursor)
+        second = self.client.get(
+            url, {'q': 'кот', 'after': first.next_cursor},
+        ).context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertIsNone(second.next_cursor)
+        self.assertFalse({p.pk for p in first} & {p.pk for p in second})
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через индекс."""
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'пёс'})
+        self.assertEqual(response.context['cl'].result_count, 1)
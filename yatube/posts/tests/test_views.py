@@ -1,9 +1,14 @@
+from http import HTTPStatus
+from unittest import mock
+
 from django import forms
 from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User
+from posts.templatetags.post_cards import card_key
+from posts.views import VISIBLE_COMMENTCOUNT
 
 LIMIT_POST = 10
 
@@ -28,7 +33,7 @@ class PostPagesTests(TestCase):
         )
 
     def setUp(self):
-
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -162,15 +167,28 @@ class PostPagesTests(TestCase):
             author=PostPagesTests.user,
             text="Текст для теста кеширования.",
         )
-        # Проверка views на кеширование
-        response_before = self.authorized_client.get(reverse("posts:index"))
         cache.clear()
         response_with = self.authorized_client.get(reverse("posts:index"))
         self.assertIn(new_post, response_with.context["page_obj"])
+        # изменение в обход сигналов не сбрасывает кеш страницы
+        Post.objects.filter(pk=new_post.pk).update(text="Другой текст.")
+        response_cached = self.authorized_client.get(reverse("posts:index"))
+        self.assertEqual(response_with.content, response_cached.content)
         new_post.delete()
         response_without = self.authorized_client.get(reverse("posts:index"))
-        self.assertEqual(response_with.content, response_without.content)
-        self.assertNotEqual(response_before, response_with)
+        self.assertNotEqual(response_with.content, response_without.content)
+
+    def test_group_page_cache_invalidated_by_new_post(self):
+        """Новый пост группы сразу виден на закешированной странице."""
+        url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        self.authorized_client.get(url)
+        Post.objects.create(
+            author=PostPagesTests.user,
+            group=self.group,
+            text="Свежий пост группы.",
+        )
+        response = self.authorized_client.get(url)
+        self.assertContains(response, "Свежий пост группы.")
 
     def test_follow_page_(self):
         """Авторизированный автор может подписаться."""
@@ -295,3 +313,226 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(value=value):
                 response = self.client.get(f'{value}?page=2')
                 self.assertEqual(len(response.context['page_obj']), expected)
+
+    def test_page_past_end_shows_last_page(self):
+        """Номер страницы за концом ленты открывает последнюю."""
+
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.user)
+        self.client.force_login(reader)
+        for name in ('posts:index', 'posts:follow_index'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), {'page': 99})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                page_obj = response.context['page_obj']
+                self.assertEqual(page_obj.number, 2)
+                self.assertEqual(len(page_obj), 3)
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация листает вперёд и назад без OFFSET."""
+
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first_page = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first_page), LIMIT_POST)
+        self.assertIsNone(first_page.previous_cursor)
+
+        second_page = self.client.get(
+            url, {'after': first_page.next_cursor}).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertIsNone(second_page.next_cursor)
+
+        back_page = self.client.get(
+            url, {'before': second_page.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertIsNone(back_page.previous_cursor)
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+
+        response = self.client.get(reverse('posts:index'), {'after': '!!'})
+        self.assertEqual(len(response.context['page_obj']), LIMIT_POST)
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страниц не зависит от числа постов на них."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        for i in range(LIMIT_POST):
+            author = User.objects.create_user(username=f'Author{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=cls.group)
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Комментарий {i}')
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Ответ {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_pages_queries(self):
+        """Списки постов и страница поста: постоянное число запросов."""
+        # плюс запросы времени последнего изменения для Last-Modified:
+        # кеш очищен, и страница собирается впервые
+        pages = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 4,
+            reverse('posts:profile', kwargs={'username': 'Author0'}): 4,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): 5,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+
+    def test_cached_pages_skip_queries(self):
+        """Закешированная страница не обращается к базе за постами."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_conditional_get(self):
+        """Повторный условный запрос получает 304 без обращения к базе."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый пост', author=self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_stale_fragment_page_not_cached(self):
+        """Страница с фрагментом прежней версии не попадает в кеш."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(text='Новый пост', author=self.reader)
+        # фрагмент пересобирает другой запрос
+        with mock.patch('core.cache.stampede.cache.add', return_value=False):
+            response = self.client.get(url)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(self.client.get(url), 'Новый пост')
+
+    def test_deleted_group_and_author_leave_cache(self):
+        """Страницы удалённых группы и автора не отдаются из кеша."""
+        group = Group.objects.create(title='Г', slug='gone', description='')
+        author = User.objects.create_user(username='Gone')
+        urls = [
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': author.username}),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+        group.delete()
+        author.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND)
+
+    def test_follow_index_queries(self):
+        """Лента подписок: постоянное число запросов."""
+        with self.assertNumQueries(4):
+            self.reader_client.get(reverse('posts:follow_index'))
+
+
+class PostCardsTests(TestCase):
+    """Карточки постов берутся из кеша и обновляются при правке."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Старый текст', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_cached_by_version(self):
+        """Правка поста меняет ключ карточки."""
+        self.client.get(reverse('posts:index'))
+        self.assertTrue(cache.get(card_key(self.post, True, False)))
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Старый текст')
+
+    def test_card_follows_author_and_group_changes(self):
+        """Имя автора, slug и удаление группы меняют ключ карточки."""
+        group = Group.objects.create(title='Г', slug='old-slug')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), '/group/old-slug/')
+
+        group.slug = 'new-slug'
+        group.save()
+        self.assertContains(self.client.get(url), '/group/new-slug/')
+        group.delete()
+        self.assertNotContains(self.client.get(url), '/group/')
+
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'Renamed'
+        author.save()
+        response = self.client.get(url)
+        self.assertContains(response, '/profile/Renamed/')
+        self.assertNotContains(response, '/profile/Author/')
+
+
+class CommentPagesTests(TestCase):
+    """Комментарии выводятся порциями по курсору (created, id)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Комментарий {i}')
+            for i in range(VISIBLE_COMMENTCOUNT + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_split_into_pages(self):
+        """Первая порция на странице поста, остальное во фрагменте."""
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), VISIBLE_COMMENTCOUNT)
+        self.assertIsNotNone(comments.next_cursor)
+
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'after': comments.next_cursor},
+        )
+        rest = response.context['comments']
+        self.assertEqual(len(rest), 5)
+        self.assertIsNone(rest.next_cursor)
+        shown = {c.pk for c in comments} | {c.pk for c in rest}
+        self.assertEqual(len(shown), VISIBLE_COMMENTCOUNT + 5)
+
+    def test_detail_ignores_cursor(self):
+        """?after= у страницы поста не подменяет первую порцию в кеше."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        first = self.client.get(url).context['comments']
+        cache.clear()
+        self.client.get(url, {'after': first.next_cursor})
+        response = self.client.get(url)
+        newest = Comment.objects.for_post().filter(post=self.post).first()
+        self.assertContains(response, newest.text)
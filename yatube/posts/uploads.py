@@ -0,0 +1,111 @@
+"""Потоковый приём картинок постов.
+
+Файл пишется на диск по мере поступления и сразу хешируется, поэтому
+хранилище не читает его заново. Размер и заголовок изображения
+(формат, ширина и высота) проверяются по первым кускам: слишком
+большой файл или «бомба» с огромным числом пикселей отбрасываются,
+не занимая ни памяти, ни процессора.
+"""
+import hashlib
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+IMAGE_FIELDS = ('image',)
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# в столько байт укладываются заголовки с EXIF и ICC-профилем
+HEADER_LIMIT = 256 * 1024
+
+
+class RejectedUpload(SimpleUploadedFile):
+    """Пустой файл вместо отвергнутой загрузки; причина — в error."""
+
+    def __init__(self, name, error):
+        super().__init__(name, b'')
+        self.error = error
+
+
+def read_header(data):
+    """Формат и размер картинки по началу файла.
+
+    None — данных пока мало; ValidationError — файл не подходит.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            # open читает только заголовок, пиксели не декодируются
+            image = Image.open(BytesIO(data))
+    except Image.DecompressionBombError:
+        raise ValidationError('Изображение слишком велико.')
+    except Exception:
+        if len(data) < HEADER_LIMIT:
+            return None
+        raise ValidationError('Файл не похож на изображение.')
+    if image.format not in IMAGE_FORMATS:
+        raise ValidationError(
+            f'Формат {image.format} не поддерживается, '
+            f'подойдут: {", ".join(IMAGE_FORMATS)}.')
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Изображение {width}x{height} слишком велико.')
+    return image.format, image.size
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет картинки постов во временный файл, проверяя их на лету.
+
+    Остальные файлы принимаются как обычно.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.header = b''
+        self.image_format = None
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name not in IMAGE_FIELDS:
+            return super().receive_data_chunk(raw_data, start)
+        if self.error:
+            return None
+        try:
+            self.check(raw_data, start)
+        except ValidationError as error:
+            self.error = error.message
+            return None
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def check(self, raw_data, start):
+        max_size = settings.POST_IMAGE_MAX_SIZE
+        if start + len(raw_data) > max_size:
+            raise ValidationError(
+                f'Файл больше {filesizeformat(max_size)}.')
+        if self.image_format is None:
+            self.header += raw_data
+            header = read_header(self.header)
+            if header is not None:
+                self.image_format = header[0]
+                self.header = b''
+
+    def file_complete(self, file_size):
+        if self.field_name not in IMAGE_FIELDS:
+            return super().file_complete(file_size)
+        if self.image_format is None and not self.error:
+            self.error = 'Файл не похож на изображение.'
+        if self.error:
+            # закрытый временный файл удаляется сам
+            self.file.close()
+            return RejectedUpload(self.file_name, self.error)
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.digest.hexdigest()
+        return upload
@@ -1,67 +1,118 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 
+from . import counters
+from .cache import cache_shared_page, page_streams
+from .feed import FollowFeed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .paginators import (CachedCountPaginator, CommentPaginator,
+                         CursorPaginator, SearchPaginator)
 
 VISIBLE_POSTCOUNT: int = 10
+VISIBLE_COMMENTCOUNT: int = 20
 
 
+@cache_shared_page
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_page_obj(posts, request)
+    posts = Post.objects.for_list()
+    # страница запрашивается, только если её нет в кеше фрагментов
+    page_obj = SimpleLazyObject(lambda: paginator_page_obj(
+        posts, request, count=counters.get(counters.POSTS)))
 
     context = {
         'page_obj': page_obj,
+        'cache_version': page_streams(request, 'posts'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_shared_page
 def group_posts(request, slug):
 
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_page_obj(posts, request)
+    posts = group.posts.for_list()
+    page_obj = SimpleLazyObject(lambda: paginator_page_obj(
+        posts, request, count=counters.get(counters.GROUP_POSTS, group.pk)))
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': page_streams(request, f'group:{group.pk}'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_shared_page
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_page_obj(posts, request)
-
-    following = request.user.is_authenticated and request.user.follower.filter(
-        author=author).exists()
+    posts = author.posts.for_list()
+    posts_count = counters.get(counters.USER_POSTS, author.pk)
+    page_obj = SimpleLazyObject(lambda: paginator_page_obj(
+        posts, request, count=posts_count))
 
     context = {
         'author': author,
+        'posts_count': posts_count,
         'page_obj': page_obj,
-        "following": following,
-
+        'cache_version': page_streams(request, f'author:{author.pk}'),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_shared_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
 
-    comments = post.comments.all()
+    # всегда первая порция комментариев: она кешируется общим
+    # фрагментом, а остальные догружаются через post_comments
+    comments = SimpleLazyObject(lambda: comments_page_obj(
+        post.comments.for_post()))
     context = {
         'post': post,
         "form": CommentForm(),
         "comments": comments,
-
+        'author_posts_count': counters.get(
+            counters.USER_POSTS, post.author_id),
+        'cache_version': page_streams(
+            request, f'post:{post.pk}', f'author:{post.author_id}'),
     }
 
     return render(request, 'posts/post_detail.html', context)
 
 
+@cache_shared_page
+def post_comments(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).for_post()
+
+    context = {
+        'post_id': post_id,
+        'comments': comments_page_obj(
+            comments, after=request.GET.get('after')),
+        'cache_version': page_streams(request, f'post:{post_id}'),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@cache_shared_page
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(
+        Post.objects.for_list(),
+        VISIBLE_POSTCOUNT,
+        query=query,
+        after=request.GET.get('after'),
+    )
+
+    context = {
+        'query': query,
+        'page_obj': SimpleLazyObject(paginator.get_page),
+        'cache_version': page_streams(request, 'posts'),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
 
@@ -103,10 +154,26 @@ def post_edit(request, post_id):
     return render(request, 'posts/create.html', context)
 
 
-def paginator_page_obj(posts, request):
-    paginator = Paginator(posts, VISIBLE_POSTCOUNT)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def paginator_page_obj(posts, request, count_key=None, count=None):
+    # старые ссылки вида ?page=N продолжают работать через OFFSET
+    if 'page' in request.GET:
+        paginator = CachedCountPaginator(
+            posts, VISIBLE_POSTCOUNT, count_key=count_key, count=count)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(
+        posts,
+        VISIBLE_POSTCOUNT,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        count_key=count_key,
+        count=count,
+    )
+    return paginator.get_page()
+
+
+def comments_page_obj(comments, after=None):
+    paginator = CommentPaginator(comments, VISIBLE_COMMENTCOUNT, after=after)
+    return paginator.get_page()
 
 
 @login_required
@@ -124,9 +191,10 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = FollowFeed(request.user)
 
-    page_obj = paginator_page_obj(posts, request)
+    page_obj = paginator_page_obj(
+        posts, request, count_key=f'posts:count:feed:{request.user.pk}')
     context = {
         "page_obj": page_obj,
     }
@@ -0,0 +1,32 @@
+// Подставляет в общую для всех страницу то, что зависит от пользователя:
+// меню, CSRF-токен форм, кнопки автора и подписки.
+(function () {
+  var nav = document.getElementById('user-nav');
+  if (!nav) {
+    return;
+  }
+  fetch(nav.dataset.chrome, {credentials: 'same-origin'})
+    .then(function (response) { return response.json(); })
+    .then(function (chrome) {
+      nav.innerHTML = chrome.nav;
+      if (!chrome.username) {
+        return;
+      }
+      document.querySelectorAll('input[name=csrfmiddlewaretoken]')
+        .forEach(function (input) { input.value = chrome.csrf_token; });
+      document.querySelectorAll('[data-auth]').forEach(function (el) {
+        var owner = el.dataset.owner;
+        var follow = el.dataset.follow;
+        if (owner && owner !== chrome.username) {
+          return;
+        }
+        if (el.dataset.notOwner === chrome.username) {
+          return;
+        }
+        if (follow && (follow === 'on') !== chrome.following) {
+          return;
+        }
+        el.hidden = false;
+      });
+    });
+})();
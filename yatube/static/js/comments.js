@@ -0,0 +1,14 @@
+// Догружает следующую порцию комментариев на место кнопки «Показать ещё».
+document.addEventListener('click', function (event) {
+  var more = event.target.closest('[data-more-comments]');
+  if (!more) {
+    return;
+  }
+  event.preventDefault();
+  fetch(more.href, {credentials: 'same-origin'})
+    .then(function (response) { return response.text(); })
+    .then(function (html) {
+      var range = document.createRange();
+      more.replaceWith(range.createContextualFragment(html));
+    });
+});
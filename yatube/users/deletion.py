@@ -0,0 +1,54 @@
+"""Удаление пользователя короткими транзакциями.
+
+Каскад User -> Post/Comment/Follow одной транзакцией надолго блокирует
+запись во всю базу SQLite. Здесь зависимые строки удаляются пачками
+по BULK_CHUNK_SIZE, каждая в своей транзакции. Каждый шаг выбирает
+ещё оставшиеся строки, поэтому прерванное удаление продолжается
+повторным запуском с того же места.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from posts import bulk
+from posts.models import Comment, Follow, Post, Timeline
+
+User = get_user_model()
+
+
+def steps(user_id):
+    """Этапы удаления: имя, оставшиеся строки и функция удаления пачки."""
+    return (
+        ('follows', Follow.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)), bulk.delete_follows),
+        ('timeline', Timeline.objects.filter(user_id=user_id),
+         bulk.delete_timeline),
+        ('comments', Comment.objects.filter(author_id=user_id),
+         bulk.delete_comments),
+        ('posts', Post.objects.filter(author_id=user_id), bulk.delete_posts),
+    )
+
+
+def remaining(user_id):
+    """Сколько зависимых строк ещё осталось удалить."""
+    return sum(rows.count() for _, rows, _ in steps(user_id))
+
+
+def delete_user(user_id, chunk_size=bulk.BULK_CHUNK_SIZE):
+    """Удаляет пользователя, отдавая (этап, число строк) после каждой пачки.
+
+    Сначала пользователь деактивируется, чтобы не мог ничего
+    добавить, пока идёт удаление.
+    """
+    User.objects.filter(pk=user_id).update(is_active=False)
+    for name, rows, delete in steps(user_id):
+        while True:
+            ids = list(rows.order_by('pk').values_list(
+                'pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            delete(ids)
+            yield name, len(ids)
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        user.delete()
+        yield 'user', 1
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import BULK_CHUNK_SIZE
+from users.deletion import delete_user, remaining
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Удаляет пользователя и всё, что он написал, короткими '
+            'транзакциями. Прерванное удаление продолжается '
+            'повторным запуском.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=BULK_CHUNK_SIZE,
+            help='Сколько строк удалять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        user_id = User.objects.filter(
+            username=options['username']).values_list('pk', flat=True).first()
+        if user_id is None:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден')
+        total = remaining(user_id)
+        done = 0
+        for step, count in delete_user(user_id, options['chunk_size']):
+            done += count
+            self.stdout.write(f'{step}: {done} / {total + 1}')
+        self.stdout.write(f'Пользователь {options["username"]} удалён')
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.models import Comment, Follow, Post, Timeline, User
+from users.deletion import delete_user, remaining
+
+
+class DeleteUserTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Leaving')
+        self.reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=self.reader, author=self.user)
+        Follow.objects.create(user=self.user, author=self.reader)
+        self.reader_post = Post.objects.create(
+            text='Пост читателя', author=self.reader)
+        for i in range(5):
+            post = Post.objects.create(text=f'Пост {i}', author=self.user)
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+            Comment.objects.create(
+                post=self.reader_post, author=self.user, text='Нет')
+
+    def assert_user_gone(self):
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(Timeline.objects.exists())
+        self.assertEqual(counters.get(counters.POSTS), 1)
+        self.assertEqual(
+            counters.get(counters.USER_FOLLOWING, self.reader.pk), 0)
+        self.assertEqual(
+            counters.get(counters.USER_FOLLOWERS, self.reader.pk), 0)
+        self.assertEqual(
+            counters.get(counters.POST_COMMENTS, self.reader_post.pk), 0)
+
+    def test_delete_in_chunks(self):
+        """Строки удаляются пачками не больше chunk_size."""
+        steps = list(delete_user(self.user.pk, chunk_size=2))
+        self.assertTrue(all(count <= 2 for _, count in steps))
+        self.assertEqual(steps[-1], ('user', 1))
+        self.assert_user_gone()
+
+    def test_resume_after_interruption(self):
+        """Прерванное удаление продолжается с того же места."""
+        steps = delete_user(self.user.pk, chunk_size=2)
+        for _ in range(3):
+            next(steps)
+        steps.close()
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        left = remaining(self.user.pk)
+        self.assertGreater(left, 0)
+        deleted = sum(
+            count for step, count in delete_user(self.user.pk)
+            if step != 'user'
+        )
+        self.assertEqual(deleted, left)
+        self.assert_user_gone()
+
+    def test_command(self):
+        out = StringIO()
+        call_command('delete_user', 'Leaving', stdout=out)
+        self.assertIn('удалён', out.getvalue())
+        self.assert_user_gone()
@@ -151,8 +151,30 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# общий кеш всех процессов сервера и run_jobs без внешнего сервиса:
+# сброс поколений из фоновых задач сразу виден веб-процессам
+# (см. описание модуля core.cache.backends)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.backends.TwoTierCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'LOCAL_MAX_ENTRIES': 1000, 'LOCAL_TIMEOUT': 1},
     }
 }
+
+# число подписчиков, начиная с которого посты автора не раскладываются
+# по лентам подписок, а подмешиваются при чтении
+FEED_PULL_THRESHOLD = 10000
+
+# до такого числа строк лента пополняется прямо в запросе,
+# а больше — фоновой задачей (manage.py run_jobs)
+FEED_INLINE_FANOUT_LIMIT = 100
+
+# через сколько секунд после снятия последней ссылки удаляются файл
+# изображения и его миниатюры (см. posts.images.release_image)
+MEDIA_GC_DELAY = 60 * 60
+
+# картинки постов принимаются потоком и проверяются по первым кускам
+FILE_UPLOAD_HANDLERS = ['posts.uploads.ImageUploadHandler']
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000